@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its timing covers the rest of the stack
+    'core.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,20 +81,80 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_CONN_MAX_AGE: seconds a connection is kept between requests (0 closes it
+# after every request, -1 keeps it forever). Behind a transaction-mode pooler
+# such as pgbouncer set DB_POOLER=pgbouncer and point DB_HOST/DB_PORT at it.
+DB_POOLER = os.environ.get('DB_POOLER', '')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASSWORD')
+        'PASSWORD': os.environ.get('DB_PASSWORD'),
+        'CONN_MAX_AGE': None if DB_CONN_MAX_AGE < 0 else DB_CONN_MAX_AGE,
+        # named cursors don't survive transaction pooling
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOLER == 'pgbouncer',
     }
 }
 
+# DB_REPLICA_HOSTS=host1,host2 adds read replicas of the default database,
+# used for the reads of safe recipe API requests (see core.routers)
+for _n, _host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{_n}'] = {**DATABASES['default'], 'HOST': _host, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+# seconds a user keeps reading from the primary after a write; the pins live
+# in the default cache, which has to be shared when there are several workers
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+# seconds an unreachable replica is skipped
+REPLICA_RETRY_SECONDS = int(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+# an open replica connection is pinged before it is chosen when its last
+# check is older than this (seconds, 0 pings every time)
+REPLICA_HEALTH_CHECK_SECONDS = float(os.environ.get('REPLICA_HEALTH_CHECK_SECONDS', 1))
+
+# ping a persistent connection before reuse when it sat idle this long
+# (seconds, 0 pings on every request, negative never pings)
+DB_HEALTH_CHECK_IDLE = float(os.environ.get('DB_HEALTH_CHECK_IDLE', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
+# PASSWORD_HASHER picks the hasher for new and rehashed passwords: scrypt
+# (hashlib, core.hashers), pbkdf2 (Django's default) or argon2 (needs
+# argon2-cffi). The rest stay listed, so older hashes still verify and are
+# upgraded on the user's next login.
+_HASHERS = {
+    'scrypt': 'core.hashers.ScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt')
+PASSWORD_HASHERS = [_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+SCRYPT_WORK_FACTOR = int(os.environ.get('SCRYPT_WORK_FACTOR', 2 ** 14))
+SCRYPT_BLOCK_SIZE = int(os.environ.get('SCRYPT_BLOCK_SIZE', 8))
+SCRYPT_PARALLELISM = int(os.environ.get('SCRYPT_PARALLELISM', 1))
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 102400))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 8))
+
+# logins hash on a pool of LOGIN_WORKERS threads (default: one per core);
+# past LOGIN_QUEUE waiting logins or LOGIN_TIMEOUT seconds they get a 503
+AUTHENTICATION_BACKENDS = ['core.backends.PooledModelBackend']
+LOGIN_WORKERS = int(os.environ.get('LOGIN_WORKERS', 0)) or None
+LOGIN_QUEUE = int(os.environ.get('LOGIN_QUEUE', 64))
+LOGIN_TIMEOUT = float(os.environ.get('LOGIN_TIMEOUT', 10))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -128,6 +190,13 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Uploaded recipe images (recipe.images). Names are content hashes, so
+# everything under MEDIA_URL can be cached by clients forever.
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+# let Django serve MEDIA_URL itself, with the long-lived cache headers
+SERVE_MEDIA = os.environ.get('SERVE_MEDIA', '1' if DEBUG else '0') == '1'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -137,4 +206,70 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
-}
\ No newline at end of file
+    # orjson based when it's installed, DRF's stdlib JSON otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # sliding-window throttles, see core.throttling
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.UserThrottle',
+        'core.throttling.IPThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.environ.get('THROTTLE_USER_RATE', '600/min'),
+        'ip': os.environ.get('THROTTLE_IP_RATE', '1200/min'),
+        # token creation hashes a password per attempt
+        'login': os.environ.get('THROTTLE_LOGIN_RATE', '20/min'),
+    },
+}
+
+# Keyset pagination for the recipe API (opt-in with ?page_size= or ?cursor=)
+RECIPE_PAGE_SIZE = int(os.environ.get('RECIPE_PAGE_SIZE', 50))
+RECIPE_MAX_PAGE_SIZE = int(os.environ.get('RECIPE_MAX_PAGE_SIZE', 500))
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 500))
+RECIPE_EXPORT_CHUNK_SIZE = int(os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 2000))
+# serve unpaginated recipe lists from recipe.fastpath instead of RecipeSerializer
+RECIPE_FAST_LIST = os.environ.get('RECIPE_FAST_LIST', '1') == '1'
+
+# Recipe image uploads: limits checked while the upload streams in, and the
+# thumbnails made by a background pool when Pillow is installed
+RECIPE_IMAGE_MAX_BYTES = int(os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10 * 2 ** 20))
+RECIPE_IMAGE_MAX_PIXELS = int(os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40_000_000))
+THUMBNAIL_SIZE = tuple(int(n) for n in os.environ.get('THUMBNAIL_SIZE', '400x400').split('x'))
+THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+
+# Token -> user lookups cached by core.authentication.CachedTokenAuthentication.
+# TOKEN_CACHE_ALIAS names an entry in CACHES to share the cache across workers;
+# it then replaces the per-process LRU, so invalidations reach every worker.
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))
+TOKEN_CACHE_ALIAS = os.environ.get('TOKEN_CACHE_ALIAS') or None
+
+# Server-Timing header with DB, serializer and total time on every response
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') == '1'
+
+# THROTTLE_CACHE_ALIAS names an entry in CACHES to share throttle counters
+# across workers; without it every process counts on its own.
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS') or None
+THROTTLE_LOCAL_SIZE = int(os.environ.get('THROTTLE_LOCAL_SIZE', 100000))
+
+# TOKEN_MODE=signed makes the token endpoint hand out signed, expiring tokens
+# (core.tokens) instead of database ones; both kinds are always accepted.
+# TOKEN_SIGNING_KEYS (comma separated, newest first) defaults to SECRET_KEY.
+# The denylist cache has to be shared by all workers.
+TOKEN_MODE = os.environ.get('TOKEN_MODE', 'db')
+SIGNED_TOKEN_TTL = int(os.environ.get('SIGNED_TOKEN_TTL', 86400))
+TOKEN_SIGNING_KEYS = [key for key in os.environ.get('TOKEN_SIGNING_KEYS', '').split(',') if key]
+TOKEN_DENYLIST_ALIAS = os.environ.get('TOKEN_DENYLIST_ALIAS', 'default')
+
+# Per-user versioned list caching (recipe.caching), off unless
+# RECIPE_CACHE_ALIAS names an entry in CACHES shared by all workers; a
+# per-process cache would keep serving lists other workers have changed.
+RECIPE_CACHE_ALIAS = os.environ.get('RECIPE_CACHE_ALIAS') or None
+RECIPE_CACHE_TTL = int(os.environ.get('RECIPE_CACHE_TTL', 300))
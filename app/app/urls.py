@@ -18,11 +18,16 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
+
+from core.views import HealthView, MetricsView, serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/health/', HealthView.as_view(), name='health'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
     path(
         'api/docs/',
@@ -31,4 +36,13 @@ urlpatterns = [
     ),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    # native async versions of the hot read endpoints, for ASGI deployments
+    path('api/async/user/', include('user.async_urls')),
+    path('api/async/recipe/', include('recipe.async_urls')),
 ]
+
+if settings.SERVE_MEDIA:
+    urlpatterns.append(
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'),
+                serve_media, name='media'),
+    )
@@ -0,0 +1,129 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core import tokens
+
+
+class LRUCache:
+    """Small thread-safe LRU with a per-entry time to live."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_tokens = LRUCache(
+    getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    getattr(settings, 'TOKEN_CACHE_TTL', 60),
+)
+
+
+def shared_tokens():
+    """The shared cache tier, or None when TOKEN_CACHE_ALIAS isn't set."""
+    alias = getattr(settings, 'TOKEN_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def shared_key(key):
+    return 'authtoken:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    local_tokens.delete(key)
+    shared = shared_tokens()
+    if shared is not None:
+        shared.delete(shared_key(key))
+
+
+def invalidate_user_tokens(user):
+    """Drop every cached token belonging to user."""
+    from rest_framework.authtoken.models import Token
+    for key in Token.objects.filter(user=user).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that remembers token -> user for TOKEN_CACHE_TTL.
+
+    With TOKEN_CACHE_ALIAS set the shared cache is the only tier, so a
+    logout, password change or deactivation in one worker (which drops the
+    entry, see core.signals) counts in every worker at once. Without it each
+    process keeps its own LRU and only sees its own invalidations; keep
+    TOKEN_CACHE_TTL short when running several workers that way.
+    """
+
+    def authenticate_credentials(self, key):
+        shared = shared_tokens()
+        if shared is not None:
+            token = shared.get(shared_key(key))
+        else:
+            token = local_tokens.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            if shared is not None:
+                ttl = getattr(settings, 'TOKEN_CACHE_TTL', 60)
+                shared.set(shared_key(key), token, ttl)
+            else:
+                local_tokens.set(key, token)
+
+        # hand out copies so a request mutating its user can't touch the
+        # cached one
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return (token.user, token)
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """Accepts core.tokens signed tokens in the usual "Token <value>" header.
+
+    Database keys are plain hex, so anything without a ':' is left to the
+    next authentication class. The user comes back with only its pk loaded,
+    which is all the recipe endpoints need.
+    """
+
+    def authenticate_credentials(self, key):
+        if ':' not in key:
+            return None
+        try:
+            claims = tokens.verify(key)
+        except tokens.InvalidToken as exc:
+            raise exceptions.AuthenticationFailed(str(exc))
+        return (tokens.token_user(claims['u']),
+                tokens.SignedToken(key, claims))
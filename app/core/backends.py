@@ -0,0 +1,102 @@
+"""
+Login backend that hashes passwords on a bounded pool of threads.
+
+hashlib (PBKDF2, scrypt) and argon2-cffi release the GIL, so LOGIN_WORKERS
+threads hash on that many cores while the request threads stay free for
+other work. At most LOGIN_QUEUE logins wait for a worker; past that, or
+after LOGIN_TIMEOUT seconds, the login is refused with a 503 instead of
+piling up more CPU work during a login storm.
+
+Only the hashing runs on the pool. The user lookup and the save of a
+rehashed password stay on the request thread and its DB connection.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class LoginBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins in progress, try again shortly.'
+    default_code = 'login_busy'
+
+
+class HashPool:
+    def __init__(self, workers, queue, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix='login')
+            return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise LoginBusy()
+        try:
+            future = self.executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # the slot is given back when the hash is done, even if we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise LoginBusy()
+
+
+hash_pool = HashPool(
+    getattr(settings, 'LOGIN_WORKERS', None) or os.cpu_count() or 1,
+    getattr(settings, 'LOGIN_QUEUE', 64),
+    getattr(settings, 'LOGIN_TIMEOUT', 10),
+)
+
+
+def _check(password, encoded):
+    """(matches, new encoded password or None); pure CPU, safe on the pool."""
+    rehashed = []
+
+    def setter(raw):
+        rehashed.append(make_password(raw))
+
+    ok = check_password(password, encoded, setter)
+    return ok, rehashed[0] if rehashed else None
+
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend with the password hashing moved to hash_pool."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # hash anyway so unknown emails take as long as wrong passwords
+            hash_pool.run(make_password, password)
+            return None
+        ok, rehashed = hash_pool.run(_check, password, user.password)
+        if not ok or not self.user_can_authenticate(user):
+            return None
+        if rehashed:
+            # older hasher or parameters: upgrade transparently
+            user.password = rehashed
+            user.save(update_fields=['password'])
+        return user
@@ -0,0 +1,99 @@
+"""
+Denormalized recipe counts on Tag, Ingredient and User.
+
+The counts move with F() expressions as recipes gain or lose tags and
+ingredients and as recipes are created or deleted (see core.signals).
+Bulk writers that skip model signals call these helpers themselves;
+bulk deletes use uncount_recipes inside counted_in_bulk(), which turns the
+per-recipe delete handler off. reconcile_counts recomputes everything in a
+few set-based UPDATEs.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps as global_apps
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# set while a bulk writer keeps the counts itself
+bulk_counting = ContextVar('bulk_counting', default=False)
+
+
+@contextmanager
+def counted_in_bulk():
+    """Skip the per-recipe delete handler of core.signals inside the block."""
+    token = bulk_counting.set(True)
+    try:
+        yield
+    finally:
+        bulk_counting.reset(token)
+
+
+def add_counts(model, deltas):
+    """Apply {pk: delta} to model.recipe_count.
+
+    One UPDATE per distinct delta.
+    """
+    by_delta = {}
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(
+            recipe_count=F('recipe_count') + delta)
+
+
+def add_links(model, pks, sign=1):
+    """Count one more (with sign=-1, one less) recipe for each pk.
+
+    Repeated pks add up.
+    """
+    add_counts(model, {pk: sign * n for pk, n in Counter(pks).items()})
+
+
+def _targets(apps):
+    """(model, rows pointing at it, column) for each counted model."""
+    Recipe = apps.get_model('core', 'Recipe')
+    return [
+        (apps.get_model('core', 'Tag'), Recipe.tags.through, 'tag_id'),
+        (apps.get_model('core', 'Ingredient'), Recipe.ingredients.through,
+         'ingredient_id'),
+        (apps.get_model('core', 'User'), Recipe, 'user_id'),
+    ]
+
+
+def _count_per(rows, column):
+    """Subquery: how many of rows point at the outer row."""
+    return Subquery(
+        rows.filter(**{column: OuterRef('pk')})
+        .order_by().values(column).annotate(n=Count('*')).values('n')
+    )
+
+
+def uncount_recipes(recipe_ids, apps=global_apps):
+    """Take the recipes out of every count, one UPDATE per model.
+
+    Call before deleting them, as the join rows go with them.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    for model, source, column in _targets(apps):
+        key = 'pk' if source._meta.model_name == 'recipe' else 'recipe_id'
+        rows = source.objects.filter(**{f'{key}__in': recipe_ids})
+        model.objects.filter(pk__in=rows.values(column)).update(
+            recipe_count=F('recipe_count') - _count_per(rows, column))
+
+
+def reconcile_counts(apps=global_apps):
+    """Reset every recipe_count that drifted from the real value.
+
+    Returns {model name: rows fixed}.
+    """
+    fixed = {}
+    for model, source, column in _targets(apps):
+        real = Coalesce(_count_per(source.objects.all(), column), Value(0))
+        fixed[model.__name__] = model.objects.exclude(
+            recipe_count=real).update(recipe_count=real)
+    return fixed
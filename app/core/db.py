@@ -0,0 +1,90 @@
+"""
+Health checks and reuse counters for persistent database connections.
+
+With CONN_MAX_AGE > 0 a connection outlives the request that opened it.
+Django only drops it when it is too old or after an error, so a connection
+that the server or a pooler closed while idle would fail the next request.
+check_connections pings a connection that sat idle longer than
+DB_HEALTH_CHECK_IDLE before the request uses it and reconnects if needed.
+
+The counters are per process; GET /api/health/ reports them.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'reused': 0,
+    'opened': 0,
+    'health_checks': 0,
+    'unusable': 0,
+}
+
+
+def _count(key, n=1):
+    with _lock:
+        _stats[key] += n
+
+
+def connection_stats():
+    """Snapshot of the counters.
+
+    reuse_ratio is the share of requests that found an open connection.
+    """
+    with _lock:
+        stats = dict(_stats)
+    requests = stats['requests']
+    stats['reuse_ratio'] = stats['reused'] / requests if requests else 0.0
+    return stats
+
+
+def reset_stats():
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+@receiver(connection_created, dispatch_uid='core.db.count_opened')
+def count_opened(sender, connection, **kwargs):
+    _count('opened')
+
+
+# Django's close_old_connections is connected first, so obsolete
+# connections are already closed when this runs
+@receiver(request_started, dispatch_uid='core.db.check_connections')
+def check_connections(**kwargs):
+    """request_started: count reuse, ping connections that idled too long."""
+    idle_limit = settings.DB_HEALTH_CHECK_IDLE
+    now = time.monotonic()
+    reused = 0
+    for conn in connections.all():
+        if conn.connection is None:
+            continue
+        reused += 1
+        last_used = getattr(conn, 'last_used', None)
+        if idle_limit < 0 or last_used is None or now - last_used < idle_limit:
+            continue
+        _count('health_checks')
+        if conn.in_atomic_block or conn.is_usable():
+            continue
+        _count('unusable')
+        # the next query opens a fresh connection
+        conn.close()
+    with _lock:
+        _stats['requests'] += 1
+        _stats['reused'] += 1 if reused else 0
+
+
+@receiver(request_finished, dispatch_uid='core.db.mark_used')
+def mark_used(**kwargs):
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is not None:
+            conn.last_used = now
@@ -0,0 +1,87 @@
+"""
+Password hashers with parameters taken from settings.
+
+ScryptPasswordHasher backports Django 4.0's scrypt hasher (same encoded
+format, so hashes keep working after an upgrade) on top of hashlib.scrypt.
+Argon2PasswordHasher is Django's, with tunable costs; it needs argon2-cffi.
+
+Changing a parameter makes must_update() true for older hashes, so users
+are rehashed with the new parameters the next time they log in.
+"""
+import base64
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_noop as _
+
+
+class ScryptPasswordHasher(hashers.BasePasswordHasher):
+    algorithm = 'scrypt'
+    work_factor = getattr(settings, 'SCRYPT_WORK_FACTOR', 2 ** 14)
+    block_size = getattr(settings, 'SCRYPT_BLOCK_SIZE', 8)
+    parallelism = getattr(settings, 'SCRYPT_PARALLELISM', 1)
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+            # OpenSSL refuses more than 32MB by default, leave room for
+            # bigger work factors
+            maxmem=256 * n * r * p, dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+    def decode(self, encoded):
+        (algorithm, work_factor, salt, block_size, parallelism,
+         hash_) = encoded.split('$', 6)
+        assert algorithm == self.algorithm
+        return {
+            'algorithm': algorithm,
+            'work_factor': int(work_factor),
+            'salt': salt,
+            'block_size': int(block_size),
+            'parallelism': int(parallelism),
+            'hash': hash_,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(
+            password, decoded['salt'], decoded['work_factor'],
+            decoded['block_size'], decoded['parallelism'],
+        )
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            _('algorithm'): decoded['algorithm'],
+            _('work factor'): decoded['work_factor'],
+            _('block size'): decoded['block_size'],
+            _('parallelism'): decoded['parallelism'],
+            _('salt'): hashers.mask_hash(decoded['salt']),
+            _('hash'): hashers.mask_hash(decoded['hash']),
+        }
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        stored = (decoded['work_factor'], decoded['block_size'],
+                  decoded['parallelism'])
+        return stored != (self.work_factor, self.block_size, self.parallelism)
+
+    def harden_runtime(self, password, encoded):
+        # the cost is fixed by the parameters stored in the hash
+        pass
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = getattr(settings, 'ARGON2_TIME_COST', 2)
+    memory_cost = getattr(settings, 'ARGON2_MEMORY_COST', 102400)
+    parallelism = getattr(settings, 'ARGON2_PARALLELISM', 8)
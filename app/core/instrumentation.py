@@ -0,0 +1,74 @@
+"""
+Per-request performance numbers: DB queries and their time, serializer
+time, plus what core.middleware.InstrumentationMiddleware measures itself.
+
+The numbers for the running request sit in a context variable, so they
+follow the request into sync_to_async threads. Every database connection
+gets an execute wrapper when it is opened; outside a request it only costs
+a context variable lookup.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('db_queries', 'db_time', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - start
+        metrics.db_queries += 1
+
+
+@receiver(connection_created,
+          dispatch_uid='core.instrumentation.install_wrapper')
+def install_wrapper(sender, connection, **kwargs):
+    # connection_created fires again on every reconnect of the same wrapper
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def serializing():
+    """Count the time spent in the block as serializer time.
+
+    Nested blocks count once.
+    """
+    metrics = current.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - start
+        metrics.serializing = False
+
+
+class TimedSerializerMixin:
+    """Serializer mixin that reports to_representation time for the request."""
+
+    def to_representation(self, instance):
+        with serializing():
+            return super().to_representation(instance)
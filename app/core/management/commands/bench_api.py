@@ -0,0 +1,207 @@
+"""
+Run scripted scenarios against a running server and record throughput,
+latency percentiles and queries per request for every endpoint.
+
+    python manage.py seed_bench_data --reset
+    gunicorn app.wsgi -w 1 -b 127.0.0.1:8000     # same database, one worker
+    python manage.py bench_api --url http://127.0.0.1:8000 --output bench.json
+    # later, on another commit
+    python manage.py bench_api --baseline bench.json
+
+Queries per request come from the server's /api/metrics/, which is per
+process, so they are only exact against a single worker. Raise the
+THROTTLE_* rates on the server, or most requests come back 429.
+
+--scenarios takes a JSON list shaped like SCENARIOS to run other requests.
+Paths may use {recipe_id}, {tag_id} and {ingredient_id} of the bench user.
+"""
+import json
+import subprocess
+import time
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from core.management.commands.loadtest import run_load
+from core.management.commands.seed_bench_data import (
+    BENCH_ADMIN, BENCH_PASSWORD, bench_users,
+)
+from core.models import Recipe
+
+# reads first, the writes change the data the reads see
+SCENARIOS = [
+    {'name': 'recipe-list', 'path': '/api/recipe/recipes/'},
+    {'name': 'recipe-list-page', 'path': '/api/recipe/recipes/?page_size=50'},
+    {'name': 'recipe-filter',
+     'path': '/api/recipe/recipes/?tags={tag_id}'
+             '&ingredients={ingredient_id}'},
+    {'name': 'recipe-search', 'path': '/api/recipe/recipes/?q=garlic'},
+    {'name': 'recipe-retrieve', 'path': '/api/recipe/recipes/{recipe_id}/'},
+    {'name': 'recipe-export',
+     'path': '/api/recipe/recipes/export/?type=ndjson'},
+    {'name': 'tag-list', 'path': '/api/recipe/tags/'},
+    {'name': 'tag-assigned', 'path': '/api/recipe/tags/?assigned_only=1'},
+    {'name': 'ingredient-list', 'path': '/api/recipe/ingredients/'},
+    {'name': 'user-me', 'path': '/api/user/me/'},
+    {'name': 'recipe-create', 'method': 'POST',
+     'path': '/api/recipe/recipes/', 'body': {
+         'title': 'bench recipe', 'time_minutes': 10, 'price': '5.00',
+         'tags': [{'name': 'tag 1'}],
+         'ingredients': [{'name': 'ingredient 1'}],
+     }},
+    {'name': 'token', 'method': 'POST', 'path': '/api/user/token/',
+     'auth': False, 'body': {
+         'email': '{email}', 'password': BENCH_PASSWORD,
+     }},
+]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def fetch_db_counters(base_url, token):
+    """{endpoint: (requests, queries)} summed from the server's metrics."""
+    request = Request(f'{base_url}/api/metrics/', headers={
+        'Authorization': f'Token {token}', 'Accept': 'application/json',
+    })
+    with urlopen(request, timeout=30) as res:
+        counters = json.load(res)['counters']
+    totals = {}
+    columns = (('requests_total', 0), ('request_db_queries_total', 1))
+    for name, index in columns:
+        for item in counters.get(name, []):
+            endpoint = item['labels']['endpoint']
+            pair = totals.setdefault(endpoint, [0, 0])
+            pair[index] += item['value']
+    return totals
+
+
+def queries_per_request(before, after):
+    requests = sum(after[e][0] - before.get(e, [0, 0])[0] for e in after)
+    queries = sum(after[e][1] - before.get(e, [0, 0])[1] for e in after)
+    # the metrics call itself is one of the counted requests
+    requests -= 1
+    return round(queries / requests, 2) if requests > 0 else None
+
+
+def fill(value, context):
+    if isinstance(value, str):
+        return value.format(**context)
+    if isinstance(value, dict):
+        return {key: fill(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, context) for item in value]
+    return value
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the API with scripted scenarios and write the results '
+            'as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='seconds per scenario')
+        parser.add_argument('--scenarios',
+                            help='JSON file with the scenarios to run')
+        parser.add_argument('--only', action='append',
+                            help='run only this scenario, may be repeated')
+        parser.add_argument('--output',
+                            help='write the results here, not to stdout')
+        parser.add_argument('--baseline',
+                            help='results of an earlier run to compare with')
+
+    def handle(self, *args, **options):
+        user = bench_users().exclude(email=BENCH_ADMIN).first()
+        if user is None:
+            raise CommandError('no benchmark data, run seed_bench_data first')
+        admin_token = Token.objects.get(user__email=BENCH_ADMIN).key
+        recipe = Recipe.objects.filter(user=user).order_by('id').first()
+        tag = user.tag_set.order_by('id').first()
+        ingredient = user.ingredient_set.order_by('id').first()
+        context = {
+            'email': user.email,
+            'recipe_id': recipe.pk if recipe else 0,
+            'tag_id': tag.pk if tag else 0,
+            'ingredient_id': ingredient.pk if ingredient else 0,
+        }
+        token = Token.objects.get(user=user).key
+
+        scenarios = SCENARIOS
+        if options['scenarios']:
+            with open(options['scenarios']) as f:
+                scenarios = json.load(f)
+        if options['only']:
+            scenarios = [s for s in scenarios if s['name'] in options['only']]
+
+        base_url = options['url'].rstrip('/')
+        results = {}
+        for scenario in scenarios:
+            headers = {'Accept': 'application/json'}
+            if scenario.get('auth', True):
+                headers['Authorization'] = f'Token {token}'
+            body = None
+            if 'body' in scenario:
+                headers['Content-Type'] = 'application/json'
+                body = json.dumps(fill(scenario['body'], context)).encode()
+            url = base_url + fill(scenario['path'], context)
+
+            before = fetch_db_counters(base_url, admin_token)
+            result = run_load(
+                url, headers, options['concurrency'], options['duration'],
+                method=scenario.get('method', 'GET'), body=body,
+            )
+            after = fetch_db_counters(base_url, admin_token)
+            result['queries_per_request'] = queries_per_request(before, after)
+            results[scenario['name']] = result
+            self.stderr.write(
+                f'{scenario["name"]:18} {result["rps"]:9.1f} req/s  '
+                f'p50 {result["p50_ms"]:7.2f} ms  '
+                f'p99 {result["p99_ms"]:7.2f} ms  '
+                f'{result["queries_per_request"]} q/req  '
+                f'{result["errors"]} errors'
+            )
+
+        report = {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'dataset': {
+                'users': bench_users().exclude(email=BENCH_ADMIN).count(),
+                'recipes': Recipe.objects.filter(
+                    user__in=bench_users()).count(),
+            },
+            'scenarios': results,
+        }
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                self.compare(json.load(f), report)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def compare(self, baseline, report):
+        commit = baseline.get('commit') or 'baseline'
+        self.stderr.write(f'compared with {commit}:')
+        for name, result in report['scenarios'].items():
+            old = baseline['scenarios'].get(name)
+            if not old or not old['rps'] or not old['p50_ms']:
+                continue
+            rps = (result['rps'] / old['rps'] - 1) * 100
+            p50 = (result['p50_ms'] / old['p50_ms'] - 1) * 100
+            self.stderr.write(
+                f'{name:18} req/s {rps:+6.1f}%  p50 {p50:+6.1f}%')
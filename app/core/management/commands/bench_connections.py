@@ -0,0 +1,97 @@
+"""
+Measure per-request overhead with and without persistent connections.
+
+    python manage.py bench_connections --requests 500
+    python manage.py bench_connections --path /api/recipe/recipes/ \\
+        --token <key>
+
+Each mode sends the same requests through the WSGI handler in-process (the
+test Client would skip Django's connection handling) with CONN_MAX_AGE set
+to 0 and then to --max-age, and reports latency and connections opened.
+"""
+import io
+import time
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.db import connection_stats, reset_stats
+from core.management.commands.loadtest import percentile
+
+
+def run_requests(handler, url, headers, count):
+    parts = urlsplit(url)
+    statuses = []
+
+    def start_response(status, response_headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    timings = []
+    for _ in range(count):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': parts.path,
+            'QUERY_STRING': parts.query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': io.StringIO(),
+            **headers,
+        }
+        start = time.perf_counter()
+        response = handler(environ, start_response)
+        b''.join(response)
+        # fires request_finished, like a WSGI server would
+        response.close()
+        timings.append(time.perf_counter() - start)
+        if statuses[-1] >= 400:
+            raise RuntimeError(f'{url} answered {statuses[-1]}')
+    return sorted(timings)
+
+
+class Command(BaseCommand):
+    help = ('Compare request latency with CONN_MAX_AGE=0 and with persistent '
+            'connections.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/health/')
+        parser.add_argument('--token',
+                            help='API token, sent as "Token <key>"')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--max-age', type=int, default=60)
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['HTTP_AUTHORIZATION'] = f'Token {options["token"]}'
+        handler = WSGIHandler()
+        original = connection.settings_dict['CONN_MAX_AGE']
+        self.stdout.write(
+            f'{"mode":12} {"mean ms":>8} {"p50 ms":>8} {"p99 ms":>8} '
+            f'{"opened":>7} {"reused":>7}')
+        modes = (('no reuse', 0), ('persistent', options['max_age']))
+        try:
+            for mode, max_age in modes:
+                # close_at is computed when connecting, so start from a
+                # closed connection
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                run_requests(handler, options['path'], headers, 5)
+                reset_stats()
+                timings = run_requests(
+                    handler, options['path'], headers, options['requests'])
+                stats = connection_stats()
+                mean = sum(timings) / len(timings)
+                self.stdout.write(
+                    f'{mode:12} {mean * 1000:8.2f} '
+                    f'{percentile(timings, 50) * 1000:8.2f} '
+                    f'{percentile(timings, 99) * 1000:8.2f} '
+                    f'{stats["opened"]:7} {stats["reused"]:7}'
+                )
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = original
@@ -0,0 +1,84 @@
+"""
+Compare DRF's JSONRenderer/JSONParser with core.renderers/core.parsers on
+recipe list payloads.
+
+    python manage.py bench_json --recipes 5000
+"""
+import io
+import time
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, orjson
+
+
+def recipe_payload(count, names):
+    """Data shaped like a RecipeSerializer list response."""
+    return [
+        OrderedDict([
+            ('id', n),
+            ('title', f'Recipe number {n} with crème fraîche'),
+            ('time_minutes', n % 120),
+            ('price', f'{n % 100}.{n % 10}0'),
+            ('tags', [
+                OrderedDict([('id', t), ('name', f'tag {t}')])
+                for t in range(n % 40, n % 40 + names)
+            ]),
+            ('ingredients', [
+                OrderedDict([('id', i), ('name', f'ingredient {i}')])
+                for i in range(names)
+            ]),
+        ])
+        for n in range(count)
+    ]
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = 'Time the JSON renderer and parser against the DRF defaults.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--names', type=int, default=5,
+                            help='tags and ingredients per recipe')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson is not installed, the fast classes fall back to DRF'))
+        data = recipe_payload(options['recipes'], options['names'])
+        body = JSONRenderer().render(data)
+        repeat = options['repeat']
+
+        rows = [
+            ('render', JSONRenderer(), FastJSONRenderer(),
+             lambda r: r.render(data)),
+            ('parse', JSONParser(), FastJSONParser(),
+             lambda p: p.parse(io.BytesIO(body))),
+        ]
+        self.stdout.write(
+            f'payload: {options["recipes"]} recipes, {len(body)} bytes')
+        for name, drf, fast, run in rows:
+            drf_time = best_of(repeat, lambda: run(drf))
+            fast_time = best_of(repeat, lambda: run(fast))
+            self.stdout.write(
+                f'{name:7} drf {drf_time * 1000:8.1f} ms   '
+                f'fast {fast_time * 1000:8.1f} ms   '
+                f'speedup {drf_time / fast_time:5.2f}x'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'identical output: {FastJSONRenderer().render(data) == body}'
+        ))
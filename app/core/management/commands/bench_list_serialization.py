@@ -0,0 +1,84 @@
+"""
+Compare RecipeSerializer with recipe.fastpath on a list of recipes.
+
+    python manage.py bench_list_serialization --recipes 2000 --repeat 5
+
+The data is created inside a transaction that is rolled back at the end.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.fastpath import recipe_dicts
+from recipe.serializers import RecipeSerializer
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = 'Time the DRF serializer against the fast list path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--names', type=int, default=5,
+                            help='tags and ingredients per recipe')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                email='bench-serialization@example.com')
+            Tag.objects.bulk_create(
+                [Tag(user=user, name=f'tag {n}') for n in range(50)])
+            Ingredient.objects.bulk_create(
+                [Ingredient(user=user, name=f'ing {n}') for n in range(50)])
+            tags = list(Tag.objects.filter(user=user))
+            ings = list(Ingredient.objects.filter(user=user))
+            Recipe.objects.bulk_create([
+                Recipe(user=user, title=f'recipe {n}',
+                       time_minutes=n % 120, price='12.50')
+                for n in range(options['recipes'])
+            ])
+            k = options['names']
+            for n, recipe in enumerate(Recipe.objects.filter(user=user)):
+                recipe.tags.add(*tags[n % 45:n % 45 + k])
+                recipe.ingredients.add(*ings[n % 45:n % 45 + k])
+
+            queryset = Recipe.objects.filter(user=user).order_by('-id')
+            renderer = JSONRenderer()
+
+            def drf():
+                qs = queryset.prefetch_related(
+                    Prefetch('tags', queryset=Tag.objects.order_by('id')),
+                    Prefetch('ingredients',
+                             queryset=Ingredient.objects.order_by('id')),
+                )
+                return renderer.render(RecipeSerializer(qs, many=True).data)
+
+            def fast():
+                return renderer.render(
+                    list(recipe_dicts(queryset, RecipeSerializer)))
+
+            slow_time, slow_body = best_of(options['repeat'], drf)
+            fast_time, fast_body = best_of(options['repeat'], fast)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'recipes:         {options["recipes"]}')
+        self.stdout.write(f'RecipeSerializer {slow_time * 1000:9.1f} ms')
+        self.stdout.write(f'fastpath         {fast_time * 1000:9.1f} ms')
+        self.stdout.write(f'identical output {slow_body == fast_body}')
+        speedup = slow_time / fast_time
+        self.stdout.write(self.style.SUCCESS(
+            f'speedup          {speedup:9.2f}x'))
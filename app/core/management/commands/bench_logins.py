@@ -0,0 +1,93 @@
+"""
+Measure logins per second (and per core) for each password hasher.
+
+    python manage.py bench_logins --threads 8 --duration 5
+
+Every hasher gets its own throwaway user. Client threads call
+authenticate() concurrently, so the numbers include the user lookup and
+the bounded hash pool of core.backends.
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import override_settings
+
+from core.backends import LoginBusy, hash_pool
+
+PASSWORD = 'bench-login-password'
+
+
+def run_logins(email, threads, duration):
+    done, busy = [], []
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        count = refused = 0
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    if authenticate(email=email, password=PASSWORD) is None:
+                        raise RuntimeError('login failed')
+                    count += 1
+                except LoginBusy:
+                    refused += 1
+        finally:
+            close_old_connections()
+        done.append(count)
+        busy.append(refused)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(done) / (time.perf_counter() - start), sum(busy)
+
+
+class Command(BaseCommand):
+    help = 'Logins per second per core for the configured password hashers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8,
+                            help='concurrent clients')
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='seconds per hasher')
+        parser.add_argument('--hasher', action='append',
+                            help='algorithm, e.g. scrypt; default all usable')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        cores = min(hash_pool.workers, os.cpu_count() or 1)
+        self.stdout.write(
+            f'{hash_pool.workers} hash workers, {os.cpu_count()} cores')
+        self.stdout.write(
+            f'{"hasher":14} {"logins/s":>9} {"per core":>9} {"refused":>8}')
+        only = options['hasher']
+        for path in settings.PASSWORD_HASHERS:
+            with override_settings(PASSWORD_HASHERS=[path]):
+                hasher = get_hasher()
+                if only and hasher.algorithm not in only:
+                    continue
+                try:
+                    hasher.encode('probe', hasher.salt())
+                except (ValueError, ImportError) as exc:
+                    self.stdout.write(f'{hasher.algorithm:14} skipped: {exc}')
+                    continue
+                email = f'bench-login-{hasher.algorithm}@example.com'
+                User.objects.filter(email=email).delete()
+                User.objects.create_user(email=email, password=PASSWORD)
+                try:
+                    rate, refused = run_logins(
+                        email, options['threads'], options['duration'])
+                finally:
+                    User.objects.filter(email=email).delete()
+            self.stdout.write(
+                f'{hasher.algorithm:14} {rate:9.1f} {rate / cores:9.1f} '
+                f'{refused:8}')
@@ -0,0 +1,88 @@
+"""
+Show query plans for the per-user recipe queries with and without the
+indexes added in core.0003, on a seeded dataset.
+
+    python manage.py bench_query_plans --users 1000 --recipes 1000
+
+The dataset comes from seed_bench_data (or is the one it already seeded)
+and is rolled back at the end unless --keep is given.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.management.commands.seed_bench_data import bench_users, generate
+from core.models import Recipe, Tag, Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Print EXPLAIN output of the per-user queries before and after the '
+        'core indexes, on seed_bench_data rows that are rolled back after.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--recipes', type=int, default=1000, help='recipes per user')
+        parser.add_argument(
+            '--names', type=int, default=20,
+            help='tags and ingredients per user')
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='commit the seeded rows instead of rolling them back')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            owners = list(bench_users().filter(is_staff=False))
+            if owners:
+                self.stdout.write(
+                    f'using the {len(owners)} existing benchmark users')
+            else:
+                owners = generate(
+                    options['users'], options['recipes'], options['names'],
+                    per_recipe=0,
+                )
+            if connection.vendor == 'postgresql':
+                # fresh rows have no planner statistics yet
+                with connection.cursor() as cursor:
+                    for model in (Recipe, Tag, Ingredient):
+                        cursor.execute(f'ANALYZE {model._meta.db_table}')
+            self.compare(owners[len(owners) // 2])
+            transaction.set_rollback(not options['keep'])
+
+    def compare(self, user):
+        queries = {
+            'recipe list':
+                Recipe.objects.filter(user=user).order_by('-id')[:50],
+            'tag list': Tag.objects.filter(user=user).order_by('-id')[:50],
+            'tag by name': Tag.objects.filter(
+                user=user, name__in=['tag 1', 'tag 2']),
+        }
+
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                'before/after comparison needs Postgres, '
+                'showing current plans only'))
+            self.explain('current', queries)
+            return
+
+        # Postgres DDL is transactional, so drop the indexes, explain,
+        # roll back.
+        with transaction.atomic():
+            with connection.schema_editor(atomic=False) as editor:
+                for model in (Recipe, Tag, Ingredient):
+                    for index in model._meta.indexes:
+                        editor.remove_index(model, index)
+                    for constraint in model._meta.constraints:
+                        editor.remove_constraint(model, constraint)
+            self.explain('before', queries)
+            transaction.set_rollback(True)
+        self.explain('after', queries)
+
+    def explain(self, label, queries):
+        opts = {}
+        if connection.vendor == 'postgresql':
+            opts = {'analyze': True, 'buffers': True}
+        for name, qs in queries.items():
+            self.stdout.write(self.style.SUCCESS(f'--- {label}: {name}'))
+            self.stdout.write(qs.explain(**opts))
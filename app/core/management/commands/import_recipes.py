@@ -0,0 +1,306 @@
+"""
+Stream recipes from a JSONL or CSV file into the database.
+
+    python manage.py import_recipes recipes.jsonl --create-users --workers 4
+
+Each record names its owner by email (`user`), or --user gives one owner
+for the whole file. Tags and ingredients are lists of names (or of
+{"name": ...} objects) in JSONL and `|`-separated in CSV, the same layout
+the export endpoint writes.
+"""
+import csv
+import io
+import json
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from core.counters import add_links
+from core.models import Recipe, Tag, Ingredient
+from recipe.caching import bump_version
+from recipe.serializers import get_or_create_many
+
+M2M = (('tags', Tag), ('ingredients', Ingredient))
+
+
+def read_records(path, fmt):
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            for row in csv.DictReader(f):
+                for field, _ in M2M:
+                    names = (row.get(field) or '').split('|')
+                    row[field] = [name for name in names if name]
+                yield row
+
+
+def parse(record, default_user):
+    """Return (email, recipe fields, {m2m field: [names]}), or None if unusable.
+
+    Values go through the model fields' own checks (lengths, digits, integer
+    range), so one bad row is skipped instead of failing a whole batch in
+    the database.
+    """
+    try:
+        fields = {
+            name: Recipe._meta.get_field(name).clean(value, None)
+            for name, value in (
+                ('title', str(record['title'])),
+                ('time_minutes', record['time_minutes']),
+                ('price', str(record['price'])),
+                ('description', record.get('description') or ''),
+            )
+        }
+        email = default_user or record['user']
+        names = {
+            field: list(dict.fromkeys(
+                model._meta.get_field('name').clean(
+                    item['name'] if isinstance(item, dict) else str(item),
+                    None,
+                )
+                for item in record.get(field) or []
+            ))
+            for field, model in M2M
+        }
+    except (KeyError, TypeError, ValidationError):
+        return None
+    return email, fields, names
+
+
+def shard_of(email, workers):
+    return zlib.crc32(email.lower().encode()) % workers
+
+
+class Importer:
+    """Writes parsed records in batches, remembering the users and names."""
+
+    def __init__(self, create_users=False, use_copy=True):
+        self.create_users = create_users
+        self.use_copy = use_copy and connection.vendor == 'postgresql'
+        self.users = {}
+        self.names = {field: {} for field, _ in M2M}
+        self.touched = set()
+        # records skipped because their owner does not exist, by email
+        self.unknown_users = Counter()
+
+    def user_ids(self, emails):
+        User = get_user_model()
+        missing = [email for email in emails if email not in self.users]
+        if missing:
+            found = dict(User.objects.filter(email__in=missing)
+                         .values_list('email', 'id'))
+            new = [email for email in missing if email not in found]
+            if new and self.create_users:
+                User.objects.bulk_create([
+                    User(email=email, password=make_password(None))
+                    for email in new
+                ], ignore_conflicts=True)
+                found.update(User.objects.filter(email__in=new)
+                             .values_list('email', 'id'))
+            self.users.update(found)
+        return self.users
+
+    def resolve_names(self, items):
+        """Make sure every (user id, name) in items has a known id.
+
+        One lookup per user and model.
+        """
+        for field, model in M2M:
+            known = self.names[field]
+            missing = {}
+            for user_id, names in items:
+                for name in names[field]:
+                    if (user_id, name) not in known:
+                        missing.setdefault(user_id, []).append(name)
+            for user_id, names in missing.items():
+                user = get_user_model()(pk=user_id)
+                for obj in get_or_create_many(model, user, names):
+                    known[(user_id, obj.name)] = obj.pk
+
+    def write(self, batch):
+        """Write one batch, returning the number of recipes inserted."""
+        users = self.user_ids({email for email, _, _ in batch})
+        self.unknown_users.update(
+            email for email, _, _ in batch if email not in users)
+        batch = [item for item in batch if item[0] in users]
+        if not batch:
+            return 0
+        with transaction.atomic():
+            recipes = [Recipe(user_id=users[email], **fields)
+                       for email, fields, _ in batch]
+            self.insert_recipes(recipes)
+            named = [(recipe, names)
+                     for recipe, (_, _, names) in zip(recipes, batch)]
+            self.resolve_names(
+                [(recipe.user_id, names) for recipe, names in named])
+            for field, _ in M2M:
+                known = self.names[field]
+                self.insert_links(field, [
+                    (recipe.pk, known[(recipe.user_id, name)])
+                    for recipe, names in named for name in names[field]
+                ])
+        self.touched.update(recipe.user_id for recipe in recipes)
+        return len(recipes)
+
+    def insert_recipes(self, recipes):
+        if self.use_copy:
+            # take ids up front so the join rows can be COPYed right after
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT nextval(pg_get_serial_sequence('core_recipe', "
+                    "'id')) FROM generate_series(1, %s)",
+                    [len(recipes)],
+                )
+                for recipe, (pk,) in zip(recipes, cursor.fetchall()):
+                    recipe.pk = pk
+            # image and thumbnail have no database default
+            columns = ['id', 'user_id', 'title', 'time_minutes', 'price',
+                       'description', 'image', 'thumbnail']
+            self.copy('core_recipe', columns, (
+                [getattr(recipe, column) for column in columns]
+                for recipe in recipes
+            ), not_null=['description', 'image', 'thumbnail'])
+        elif connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            # save() counts the recipe through core.signals
+            for recipe in recipes:
+                recipe.save()
+            return
+        add_links(get_user_model(), [recipe.user_id for recipe in recipes])
+
+    def insert_links(self, field, pairs):
+        if not pairs:
+            return
+        through = getattr(Recipe, field).through
+        column = Recipe._meta.get_field(field).m2m_reverse_field_name() + '_id'
+        if self.use_copy:
+            self.copy(through._meta.db_table, ['recipe_id', column], pairs)
+        else:
+            through.objects.bulk_create([
+                through(recipe_id=r, **{column: pk}) for r, pk in pairs])
+        add_links(Recipe._meta.get_field(field).related_model,
+                  [pk for _, pk in pairs])
+
+    def copy(self, table, columns, rows, not_null=()):
+        """COPY rows in; CSV reads an empty field as NULL unless not_null."""
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerows(rows)
+        buf.seek(0)
+        options = 'FORMAT csv'
+        if not_null:
+            options += f', FORCE_NOT_NULL ({", ".join(not_null)})'
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f'COPY {table} ({", ".join(columns)}) '
+                f'FROM STDIN WITH ({options})', buf)
+
+    def finish(self):
+        for user_id in self.touched:
+            bump_version(user_id)
+
+
+def run_import(path, fmt, options, shard=None, workers=1, progress=None):
+    """Import the records of one user shard (all of them if shard is None).
+
+    Returns (imported, unparsable records, Counter of unknown owner emails).
+    """
+    importer = Importer(options['create_users'], not options['no_copy'])
+    records = (parse(record, options['user'])
+               for record in read_records(path, fmt))
+    parsed = skipped = 0
+    start = time.perf_counter()
+    while True:
+        batch = list(islice(records, options['batch_size']))
+        if not batch:
+            break
+        good = [item for item in batch if item is not None]
+        skipped += len(batch) - len(good)
+        if shard is not None:
+            good = [item for item in good
+                    if shard_of(item[0], workers) == shard]
+        parsed += importer.write(good)
+        if progress:
+            progress(parsed, time.perf_counter() - start)
+    importer.finish()
+    return parsed, skipped, importer.unknown_users
+
+
+def _worker(args):
+    path, fmt, options, shard, workers = args
+    # each process opens its own database connection
+    connections.close_all()
+    return run_import(path, fmt, options, shard, workers)
+
+
+class Command(BaseCommand):
+    help = 'Import recipes from a JSONL or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['jsonl', 'csv'],
+                            help='default: from the file extension')
+        parser.add_argument('--user', help='owner email for every record')
+        parser.add_argument('--create-users', action='store_true',
+                            help='create owners that do not exist yet')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='processes, each importing one user shard')
+        parser.add_argument('--no-copy', action='store_true',
+                            help='use bulk_create even on Postgres')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt is None:
+            fmt = 'csv' if path.endswith('.csv') else 'jsonl'
+        workers = options['workers']
+        # only plain values, these get pickled to the worker processes
+        options = {key: options[key] for key in
+                   ('user', 'create_users', 'batch_size', 'no_copy')}
+        start = time.perf_counter()
+        try:
+            if workers > 1:
+                connections.close_all()
+                with ProcessPoolExecutor(workers) as pool:
+                    results = list(pool.map(_worker, [
+                        (path, fmt, options, n, workers)
+                        for n in range(workers)
+                    ]))
+                imported = sum(r[0] for r in results)
+                # every worker reads the whole file, so each saw every bad row
+                skipped = results[0][1]
+                # but only the owners of its own shard
+                unknown = sum((r[2] for r in results), Counter())
+            else:
+                imported, skipped, unknown = run_import(
+                    path, fmt, options, progress=self.progress)
+        except OSError as e:
+            raise CommandError(e)
+
+        elapsed = time.perf_counter() - start
+        rate = imported / max(elapsed, 1e-9)
+        skipped += sum(unknown.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes in {elapsed:.1f}s '
+            f'({rate:.0f} rows/s), skipped {skipped} bad records'
+        ))
+        for email, count in sorted(unknown.items()):
+            self.stdout.write(self.style.WARNING(
+                f'skipped {count} records: unknown user {email}'))
+
+    def progress(self, count, elapsed):
+        rate = count / max(elapsed, 1e-9)
+        self.stdout.write(f'{count} rows, {rate:.0f} rows/s')
@@ -0,0 +1,128 @@
+"""
+Fire GET requests at one or more running servers and report throughput and
+latency percentiles for each.
+
+Compare the WSGI and ASGI deployments of the same code, e.g.
+
+    gunicorn app.wsgi -w 4 -b 127.0.0.1:8000
+    gunicorn app.asgi -w 4 -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8001
+    python manage.py loadtest --token <key> \\
+        --target wsgi=http://127.0.0.1:8000/api/recipe/recipes/ \\
+        --target asgi=http://127.0.0.1:8001/api/async/recipe/recipes/
+
+Raise THROTTLE_USER_RATE and THROTTLE_IP_RATE on the servers under test,
+otherwise most of the run measures 429 responses.
+"""
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = round(pct / 100 * len(sorted_values)) - 1
+    index = min(len(sorted_values) - 1, max(0, rank))
+    return sorted_values[index]
+
+
+def run_load(url, headers, concurrency, duration, method='GET', body=None):
+    """Hit url from `concurrency` keep-alive connections for `duration` s."""
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    if parts.scheme == 'https':
+        conn_class = http.client.HTTPSConnection
+    else:
+        conn_class = http.client.HTTPConnection
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        conn = conn_class(parts.netloc, timeout=30)
+        mine, failed = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                res = conn.getresponse()
+                res.read()
+                if res.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = conn_class(parts.netloc, timeout=30)
+                continue
+            mine.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'url': url,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p90_ms': percentile(latencies, 90) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Measure requests per second and latency percentiles of '
+            'running servers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='name=url, may be repeated')
+        parser.add_argument('--token',
+                            help='API token, sent as "Token <key>"')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10.0,
+                            help='seconds per target')
+        parser.add_argument('--json', action='store_true',
+                            help='print the results as JSON')
+
+    def handle(self, *args, **options):
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        results = {}
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(
+                    f'--target must look like name=url, got {target!r}')
+            results[name] = run_load(
+                url, headers, options['concurrency'], options['duration'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f'{"target":10} {"req/s":>9} {"p50 ms":>8} {"p90 ms":>8} '
+            f'{"p99 ms":>8} {"errors":>7}')
+        for name, r in results.items():
+            self.stdout.write(
+                f'{name:10} {r["rps"]:9.1f} {r["p50_ms"]:8.2f} '
+                f'{r["p90_ms"]:8.2f} {r["p99_ms"]:8.2f} {r["errors"]:7}'
+            )
@@ -0,0 +1,23 @@
+"""
+Recompute the denormalized recipe_count columns from the join tables.
+
+    python manage.py reconcile_counts
+
+Safe to run at any time, e.g. nightly or after a manual data fix; only
+rows whose stored count drifted are written.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.counters import reconcile_counts
+
+
+class Command(BaseCommand):
+    help = 'Repair recipe_count on tags, ingredients and users.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = reconcile_counts()
+        for name, count in fixed.items():
+            self.stdout.write(f'{name}: {count} fixed')
+        self.stdout.write(self.style.SUCCESS('Counts reconciled'))
@@ -0,0 +1,150 @@
+"""
+Seed a deterministic benchmark dataset: N users x M recipes each, with K
+tags and K ingredients per user and a few of them linked to every recipe.
+
+    python manage.py seed_bench_data --users 50 --recipes 200 --names 20
+
+The same --seed always produces the same content, so numbers taken on two
+commits are comparable. Every user gets an API token; bench_api reads them
+from the database.
+"""
+import random
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from rest_framework.authtoken.models import Token
+
+from core.counters import reconcile_counts
+from core.models import Recipe, Tag, Ingredient
+
+BENCH_EMAIL = 'api-bench-{}@example.com'
+BENCH_ADMIN = 'api-bench-admin@example.com'
+BENCH_PASSWORD = 'bench-password'
+# rows per INSERT, and about as many recipes held in memory at once
+BATCH_SIZE = 5000
+WORDS = (
+    'tomato', 'basil', 'garlic', 'lemon', 'chicken', 'rice', 'curry',
+    'soup', 'salad', 'roast', 'spicy', 'green', 'quick', 'baked', 'fried',
+    'noodle', 'mushroom', 'cheese', 'ginger', 'honey',
+)
+
+
+def bench_users():
+    return get_user_model().objects.filter(
+        email__startswith='api-bench-').order_by('id')
+
+
+def _with_ids(model, objs, **filters):
+    """objs after bulk_create, with their ids.
+
+    Re-read in insert order where the backend returns no ids.
+    """
+    created = model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    if any(obj.pk is None for obj in created):
+        created = list(model.objects.filter(**filters).order_by('id'))
+    return created
+
+
+@transaction.atomic
+def generate(users, recipes, names, per_recipe=3, seed=0):
+    """Create the dataset, return the bench users (not the staff one)."""
+    if bench_users().exists():
+        raise CommandError(
+            'benchmark data already exists, pass --reset to recreate it')
+    rnd = random.Random(seed)
+    User = get_user_model()
+    password = make_password(BENCH_PASSWORD)
+
+    owners = _with_ids(User, [
+        User(email=BENCH_EMAIL.format(i), name=f'bench {i}',
+             password=password)
+        for i in range(users)
+    ], email__startswith='api-bench-')
+    # reads /api/metrics/ for the queries per request
+    admin = User.objects.create(
+        email=BENCH_ADMIN, name='bench admin', is_staff=True)
+    admin.set_unusable_password()
+    admin.save()
+    Token.objects.bulk_create([
+        Token(user=user, key=Token.generate_key())
+        for user in [*owners, admin]
+    ], batch_size=BATCH_SIZE)
+
+    pools = {}
+    for field, model in (('tags', Tag), ('ingredients', Ingredient)):
+        prefix = model.__name__.lower()
+        objs = _with_ids(model, [
+            model(user=user, name=f'{prefix} {n}')
+            for user in owners for n in range(names)
+        ], user__in=owners)
+        for obj in objs:
+            pools.setdefault((field, obj.user_id), []).append(obj.pk)
+
+    rows = (
+        Recipe(
+            user=user,
+            title=f'{rnd.choice(WORDS)} {rnd.choice(WORDS)} {n}',
+            time_minutes=rnd.randint(5, 180),
+            price=f'{rnd.randint(1, 50)}.{rnd.randint(0, 99):02d}',
+            description=' '.join(rnd.choices(WORDS, k=12)),
+        )
+        for user in owners for n in range(recipes)
+    )
+    # BATCH_SIZE recipes at a time, so memory stays flat however many are
+    # asked for
+    while True:
+        chunk = list(islice(rows, BATCH_SIZE))
+        if not chunk:
+            break
+        last = Recipe.objects.aggregate(last=Max('id'))['last'] or 0
+        _link(_with_ids(Recipe, chunk, pk__gt=last), pools, per_recipe, rnd)
+    # the bulk inserts skipped the counter signals
+    reconcile_counts()
+    return owners
+
+
+def _link(rows, pools, per_recipe, rnd):
+    """Give every recipe in rows per_recipe of its owner's tags/ingredients."""
+    for field in ('tags', 'ingredients'):
+        through = getattr(Recipe, field).through
+        column = Recipe._meta.get_field(field).m2m_reverse_field_name() + '_id'
+        links = []
+        for recipe in rows:
+            pool = pools.get((field, recipe.user_id), [])
+            links.extend(
+                through(recipe_id=recipe.pk, **{column: pk})
+                for pk in rnd.sample(pool, min(per_recipe, len(pool)))
+            )
+        through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+
+class Command(BaseCommand):
+    help = 'Seed a deterministic dataset for bench_api.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--recipes', type=int, default=200,
+                            help='recipes per user')
+        parser.add_argument('--names', type=int, default=20,
+                            help='tags and ingredients per user')
+        parser.add_argument('--per-recipe', type=int, default=3,
+                            help='tags and ingredients linked to each recipe')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--reset', action='store_true',
+                            help='delete existing benchmark data first')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            bench_users().delete()
+        owners = generate(
+            options['users'], options['recipes'], options['names'],
+            options['per_recipe'], options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(owners)} users with {options["recipes"]} recipes '
+            'each'
+        ))
@@ -0,0 +1,86 @@
+"""
+In-process counters and histograms for operational metrics.
+
+Each worker keeps its own values; scrape every worker (or sum them) to get
+the totals. GET /api/metrics/ returns them as JSON, or in the Prometheus
+text format with ?format=prometheus.
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+# key -> [count per bucket (the last one is +Inf), sum, count]
+_histograms = {}
+_buckets = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, n=1, **labels):
+    """Add n to the counter `name` with the given labels."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] += n
+
+
+def observe(name, value, buckets, **labels):
+    """Record value in the histogram `name`.
+
+    buckets are the sorted upper bounds.
+    """
+    key = _key(name, labels)
+    index = bisect.bisect_left(buckets, value)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * (len(buckets) + 1), 0, 0]
+            _buckets[name] = buckets
+        histogram[0][index] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+
+def counters():
+    """{name: [{'labels': {...}, 'value': n}, ...]}"""
+    with _lock:
+        items = list(_counters.items())
+    result = {}
+    for (name, labels), value in sorted(items):
+        result.setdefault(name, []).append(
+            {'labels': dict(labels), 'value': value})
+    return result
+
+
+def histograms():
+    """{name: [{'labels', 'buckets', 'sum', 'count'}, ...]}
+
+    buckets is [[le, cumulative count], ...].
+    """
+    with _lock:
+        items = [(key, ([*counts], total, count))
+                 for key, (counts, total, count) in _histograms.items()]
+        bounds = dict(_buckets)
+    result = {}
+    for (name, labels), (counts, total, count) in sorted(items):
+        cumulative, buckets = 0, []
+        for le, n in zip([*bounds[name], '+Inf'], counts):
+            cumulative += n
+            buckets.append([le, cumulative])
+        result.setdefault(name, []).append({
+            'labels': dict(labels),
+            'buckets': buckets,
+            'sum': total,
+            'count': count,
+        })
+    return result
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _buckets.clear()
@@ -0,0 +1,94 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core import metrics
+from core.instrumentation import RequestMetrics, current
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def endpoint_name(match, method):
+    """`recipe-list` style name of the viewset action, else the URL name."""
+    if match is None:
+        return 'unmatched'
+    actions = getattr(match.func, 'actions', None)
+    basename = getattr(match.func, 'initkwargs', {}).get('basename')
+    if actions and basename:
+        action = actions.get(method.lower())
+        if action:
+            return f'{basename}-{action}'
+    return match.view_name
+
+
+class InstrumentationMiddleware:
+    """Latency, DB and serializer time and response size per endpoint.
+
+    Results go to core.metrics and, with SERVER_TIMING on, into a
+    Server-Timing header browsers show in their network panel.
+
+    Works both ways, so under ASGI the chain stays async and only the sync
+    views are run on threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request_metrics = RequestMetrics()
+        token = current.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        elapsed = time.perf_counter() - start
+        return self.record(request, response, request_metrics, elapsed)
+
+    async def __acall__(self, request):
+        request_metrics = RequestMetrics()
+        token = current.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        elapsed = time.perf_counter() - start
+        return self.record(request, response, request_metrics, elapsed)
+
+    def record(self, request, response, request_metrics, elapsed):
+        endpoint = endpoint_name(
+            getattr(request, 'resolver_match', None), request.method)
+        metrics.observe('request_duration_seconds', elapsed, LATENCY_BUCKETS,
+                        endpoint=endpoint)
+        metrics.inc('requests_total', endpoint=endpoint,
+                    status=response.status_code)
+        metrics.inc('request_db_queries_total', request_metrics.db_queries,
+                    endpoint=endpoint)
+        metrics.inc('request_db_seconds_total', request_metrics.db_time,
+                    endpoint=endpoint)
+        metrics.inc('request_serializer_seconds_total',
+                    request_metrics.serializer_time, endpoint=endpoint)
+        if not response.streaming:
+            metrics.observe('response_size_bytes', len(response.content),
+                            SIZE_BUCKETS, endpoint=endpoint)
+
+        if getattr(settings, 'SERVER_TIMING', True):
+            response['Server-Timing'] = (
+                f'db;dur={request_metrics.db_time * 1000:.2f};'
+                f'desc="{request_metrics.db_queries} queries", '
+                f'ser;dur={request_metrics.serializer_time * 1000:.2f}, '
+                f'total;dur={elapsed * 1000:.2f}'
+            )
+        return response
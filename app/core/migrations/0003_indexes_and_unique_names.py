@@ -0,0 +1,59 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold duplicate (user, name) tags/ingredients into the oldest row."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        column = model_name.lower()
+        dupes = (
+            model.objects.values('user', 'name')
+            .annotate(keep=Min('id'), n=Count('id'))
+            .filter(n__gt=1)
+        )
+        for dupe in dupes:
+            others = list(
+                model.objects.filter(user=dupe['user'], name=dupe['name'])
+                .exclude(id=dupe['keep']).values_list('id', flat=True)
+            )
+            for other in others:
+                linked = list(through.objects.filter(**{f'{column}_id': dupe['keep']}).values_list('recipe_id', flat=True))
+                through.objects.filter(**{f'{column}_id': other, 'recipe_id__in': linked}).delete()
+                through.objects.filter(**{f'{column}_id': other}).update(**{f'{column}_id': dupe['keep']})
+            model.objects.filter(id__in=others).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_ingredient_recipe_tag'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-id'], name='ingredient_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-id'], name='tag_user_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_ingredient_user_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_user_name'),
+        ),
+    ]
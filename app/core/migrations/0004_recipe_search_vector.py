@@ -0,0 +1,59 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:54
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+FORWARD_SQL = [
+    """
+    CREATE FUNCTION core_recipe_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON core_recipe
+    FOR EACH ROW EXECUTE PROCEDURE core_recipe_search_vector_update()
+    """,
+    """
+    UPDATE core_recipe SET search_vector =
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    """,
+    'CREATE INDEX core_recipe_search_vector_gin ON core_recipe USING gin (search_vector)',
+]
+
+REVERSE_SQL = [
+    'DROP INDEX IF EXISTS core_recipe_search_vector_gin',
+    'DROP TRIGGER IF EXISTS core_recipe_search_vector_trigger ON core_recipe',
+    'DROP FUNCTION IF EXISTS core_recipe_search_vector_update()',
+]
+
+
+def run_on_postgres(statements):
+    """Other backends use the in-memory index in recipe.search instead."""
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for sql in statements:
+                schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_indexes_and_unique_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(run_on_postgres(FORWARD_SQL), run_on_postgres(REVERSE_SQL)),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image',
+            field=models.FileField(blank=True, editable=False, max_length=255, upload_to='recipes/'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.FileField(blank=True, editable=False, max_length=255, upload_to='recipes/thumbs/'),
+        ),
+    ]
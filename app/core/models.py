@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.conf import settings
 # Create your models here.
@@ -23,6 +24,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # denormalized, kept in step by core.signals; reconcile_counts repairs
+    # drift
+    recipe_count = models.IntegerField(default=0, editable=False)
 
     objects = UserManager() # assign user manager to the user class
 
@@ -31,12 +35,28 @@ class User(AbstractBaseUser, PermissionsMixin):
 class Tag(models.Model):
     name = models.CharField(max_length=100)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='tag_user_id_idx')]
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'name'], name='unique_tag_user_name')]
+
     def __str__(self):
         return f'{self.name}'
 
 class Ingredient(models.Model):
     name = models.CharField(max_length=100)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [models.Index(
+            fields=['user', '-id'], name='ingredient_user_id_idx')]
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'name'], name='unique_ingredient_user_name')]
+
     def __str__(self):
         return f'{self.name}'
 
@@ -48,7 +68,19 @@ class Recipe(models.Model):
     description = models.TextField(blank=True)
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
-    # TODO image field
+    # weighted title/description tsvector, kept up to date by a trigger on
+    # Postgres (core.0004)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # content-addressed names written by recipe.images; the thumbnail is
+    # filled in by the background pool once it exists
+    image = models.FileField(upload_to='recipes/', max_length=255,
+                             blank=True, editable=False)
+    thumbnail = models.FileField(upload_to='recipes/thumbs/', max_length=255,
+                                 blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='recipe_user_id_idx')]
 
     def __str__(self):
         return f'{self.title}'
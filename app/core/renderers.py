@@ -0,0 +1,115 @@
+"""
+JSON rendering through orjson when it is installed.
+
+orjson is optional: without it, or for output it can't produce the same way
+(indented, ASCII-only or non-strict JSON), everything goes through DRF's
+stdlib based JSONRenderer. Types orjson doesn't know natively, and
+datetimes whose format differs, are handed to DRF's JSONEncoder, so values
+like Decimal render exactly as before.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+_encoder = JSONEncoder()
+if orjson is not None:
+    ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+
+def _escape_separators(data):
+    # DRF escapes these so the output is also valid javascript
+    if b'\xe2\x80\xa8' in data or b'\xe2\x80\xa9' in data:
+        data = data.replace(b'\xe2\x80\xa8', b'\\u2028')
+        data = data.replace(b'\xe2\x80\xa9', b'\\u2029')
+    return data
+
+
+def dumps(data):
+    """Compact JSON bytes for data, as FastJSONRenderer().render(data)."""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    return _escape_separators(orjson.dumps(
+        data, default=_encoder.default, option=ORJSON_OPTIONS))
+
+
+def iter_json_array(items, chunk_size=500):
+    """Encode an iterable as one JSON array, chunk_size items at a time."""
+    yield b'['
+    chunk = []
+    first = True
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            body = dumps(chunk)[1:-1]
+            yield body if first else b',' + body
+            first = False
+            chunk = []
+    if chunk:
+        body = dumps(chunk)[1:-1]
+        yield body if first else b',' + body
+    yield b']'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that uses orjson for compact, strict, UTF-8 output.
+
+    That is what the API sends; anything else goes through DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            orjson is None or data is None or indent is not None
+            or not self.compact or self.ensure_ascii or not self.strict
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class PrometheusRenderer(BaseRenderer):
+    """core.metrics data in the Prometheus text format.
+
+    Takes {'counters': ..., 'histograms': ...} like MetricsView returns.
+    """
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict) or 'counters' not in data:
+            # errors (403 and the like) keep their detail readable
+            return str(data).encode()
+        lines = []
+        for name, series in data['counters'].items():
+            lines.append(f'# TYPE {name} counter')
+            lines.extend(f'{name}{_labels(s["labels"])} {s["value"]}'
+                         for s in series)
+        for name, series in data.get('histograms', {}).items():
+            lines.append(f'# TYPE {name} histogram')
+            for s in series:
+                labels = s['labels']
+                for le, count in s['buckets']:
+                    bucket = _labels({**labels, 'le': le})
+                    lines.append(f'{name}_bucket{bucket} {count}')
+                lines.append(f'{name}_sum{_labels(labels)} {s["sum"]}')
+                lines.append(f'{name}_count{_labels(labels)} {s["count"]}')
+        return ('\n'.join(lines) + '\n').encode()
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return '{' + pairs + '}'
@@ -0,0 +1,146 @@
+"""
+Send the reads of safe API requests to a read replica.
+
+ReplicaReadMixin picks a replica for GET/HEAD/OPTIONS requests once the
+user is authenticated. ReplicaRouter then routes every read in the request
+to that replica, and all writes (and everything outside such a request) to
+`default`. A user who wrote in the last REPLICA_STICKY_SECONDS reads from
+`default` so they see their own writes. A replica that fails to connect is
+skipped for REPLICA_RETRY_SECONDS; an open replica connection is pinged
+before it is chosen, at most every REPLICA_HEALTH_CHECK_SECONDS, so one
+that died under load is noticed too. A streaming response (the export)
+keeps reading from the replica while it is iterated.
+
+To try it locally with two SQLite files:
+
+    DATABASES = {
+        'default': {'ENGINE': 'django.db.backends.sqlite3',
+                    'NAME': 'primary.sqlite3'},
+        'replica1': {'ENGINE': 'django.db.backends.sqlite3',
+                     'NAME': 'replica.sqlite3'},
+    }
+    REPLICA_DATABASES = ['replica1']
+
+then `migrate` both databases and copy primary.sqlite3 over replica.sqlite3
+to "replicate".
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+# alias chosen for the current request, None means default
+current_replica = ContextVar('current_replica', default=None)
+# alias -> monotonic time until which it is considered down
+_down = {}
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin(user):
+    """Read user's data from the primary for REPLICA_STICKY_SECONDS."""
+    if settings.REPLICA_STICKY_SECONDS > 0:
+        caches['default'].set(
+            pin_key(user.pk), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user):
+    return caches['default'].get(pin_key(user.pk)) is not None
+
+
+def _reachable(alias):
+    conn = connections[alias]
+    now = time.monotonic()
+    if conn.connection is not None:
+        checked = getattr(conn, 'replica_checked', None)
+        interval = settings.REPLICA_HEALTH_CHECK_SECONDS
+        if checked is not None and now - checked < interval:
+            return True
+        if conn.in_atomic_block or conn.is_usable():
+            conn.replica_checked = now
+            return True
+        conn.close()
+    try:
+        conn.ensure_connection()
+    except DatabaseError:
+        _down[alias] = now + settings.REPLICA_RETRY_SECONDS
+        return False
+    conn.replica_checked = now
+    return True
+
+
+def choose_replica():
+    """A reachable replica alias, or None to fall back to the primary."""
+    now = time.monotonic()
+    candidates = [alias for alias in settings.REPLICA_DATABASES
+                  if _down.get(alias, 0) <= now]
+    random.shuffle(candidates)
+    for alias in candidates:
+        if _reachable(alias):
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return current_replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+
+def _on_replica(alias, iterator):
+    """Iterate iterator with its reads routed to alias."""
+    iterator = iter(iterator)
+    while True:
+        # set around each step only, a generator shares the caller's context
+        token = current_replica.set(alias)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            current_replica.reset(token)
+        yield item
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from a replica unless the user wrote recently."""
+
+    def dispatch(self, request, *args, **kwargs):
+        token = current_replica.set(None)
+        self.writer = None
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            alias = current_replica.get()
+        finally:
+            current_replica.reset(token)
+        if alias is not None and getattr(response, 'streaming', False):
+            # the body is read after dispatch returns
+            response.streaming_content = _on_replica(
+                alias, response.streaming_content)
+        if self.writer is not None:
+            # restart the window now that the write has committed
+            pin(self.writer)
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        # authentication runs in here, against the primary
+        super().initial(request, *args, **kwargs)
+        if not settings.REPLICA_DATABASES:
+            return
+        if request.method not in SAFE_METHODS:
+            self.writer = request.user
+            pin(request.user)
+        elif not is_pinned(request.user):
+            current_replica.set(choose_replica())
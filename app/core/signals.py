@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_token, invalidate_user_tokens
+from core.counters import add_counts, add_links, bulk_counting
+from core.tokens import revoke_user
+from core.models import Recipe, Tag, Ingredient
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def drop_user_tokens(sender, instance, created, **kwargs):
+    # cached tokens carry a copy of the user, so any change (password,
+    # is_active) evicts them
+    if not created:
+        invalidate_user_tokens(instance)
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def revoke_signed_tokens(sender, instance, **kwargs):
+    # _password is only set between set_password() and save(); a rehash on
+    # login assigns the hash directly and keeps the user's tokens
+    changed = instance._password is not None or not instance.is_active
+    if instance.pk and changed:
+        revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    revoke_user(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def count_new_recipe(sender, instance, created, **kwargs):
+    if created:
+        add_counts(get_user_model(), {instance.user_id: 1})
+
+
+@receiver(pre_delete, sender=Recipe)
+def uncount_deleted_recipe(sender, instance, **kwargs):
+    if bulk_counting.get():
+        return
+    # the join rows go away without m2m_changed, so read them first
+    add_counts(get_user_model(), {instance.user_id: -1})
+    add_links(Tag, instance.tags.values_list('id', flat=True), -1)
+    add_links(
+        Ingredient, instance.ingredients.values_list('id', flat=True), -1)
+
+
+def _count_m2m(model, instance, action, reverse, pk_set):
+    if action == 'pre_clear':
+        # remember what clear is about to drop
+        if reverse:
+            related = instance.recipe_set
+        else:
+            related = getattr(instance, _field_of(model))
+        instance._cleared_pks = list(related.values_list('id', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_pks', [])
+        sign = -1
+    elif action in ('post_add', 'post_remove'):
+        sign = 1 if action == 'post_add' else -1
+    else:
+        return
+    if not pk_set:
+        return
+    if reverse:
+        # instance is the tag/ingredient, pk_set the recipes
+        add_counts(model, {instance.pk: sign * len(pk_set)})
+    else:
+        add_links(model, pk_set, sign)
+
+
+def _field_of(model):
+    return 'tags' if model is Tag else 'ingredients'
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def count_tag_links(sender, instance, action, reverse, pk_set, **kwargs):
+    _count_m2m(Tag, instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_ingredient_links(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    _count_m2m(Ingredient, instance, action, reverse, pk_set)
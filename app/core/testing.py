@@ -0,0 +1,117 @@
+"""
+Performance budgets for tests.
+
+    class RecipeApiTests(QueryBudgetMixin, TestCase):
+        query_budgets = {'recipe-list': Budget(queries=3)}
+
+        def test_list(self):
+            res = self.request_within_budget('get', RECIPES_URL)
+
+    @query_budget(queries=4, db_ms=50)
+    def test_something(self):
+        ...
+
+    with self.assertBudget(queries=2, wall_ms=200):
+        ...
+
+A blown budget fails the test with every query of the block listed, with
+its time. Wall-clock budgets are noisy on shared CI machines; set
+PERF_BUDGET_WALL_FACTOR to scale them (0 turns them off).
+"""
+import functools
+import os
+import time
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from core.middleware import endpoint_name
+
+Budget = namedtuple('Budget', ['queries', 'db_ms', 'wall_ms'],
+                    defaults=[None, None, None])
+
+
+def wall_factor():
+    return float(os.environ.get('PERF_BUDGET_WALL_FACTOR', 1))
+
+
+def format_queries(captured):
+    return '\n'.join(
+        f'  {n}. [{alias}] ({float(query["time"]) * 1000:.2f} ms) '
+        f'{query["sql"]}'
+        for n, (alias, query) in enumerate(captured, 1)
+    )
+
+
+@contextmanager
+def budget_check(test, budget, label='block', using=(DEFAULT_DB_ALIAS,)):
+    """Fail `test` if the block goes over any limit set in budget."""
+    with ExitStack() as stack:
+        contexts = [
+            (alias, stack.enter_context(
+                CaptureQueriesContext(connections[alias])))
+            for alias in using
+        ]
+        start = time.perf_counter()
+        yield
+        wall_ms = (time.perf_counter() - start) * 1000
+
+    captured = [(alias, query)
+                for alias, ctx in contexts for query in ctx.captured_queries]
+    db_ms = sum(float(query['time']) for _, query in captured) * 1000
+    problems = []
+    if budget.queries is not None and len(captured) > budget.queries:
+        problems.append(f'{len(captured)} queries, budget {budget.queries}')
+    if budget.db_ms is not None and db_ms > budget.db_ms:
+        problems.append(
+            f'{db_ms:.2f} ms in the database, budget {budget.db_ms} ms')
+    factor = wall_factor()
+    if budget.wall_ms is not None and factor:
+        limit = budget.wall_ms * factor
+        if wall_ms > limit:
+            problems.append(
+                f'{wall_ms:.2f} ms wall clock, budget {limit:.0f} ms')
+    if problems:
+        test.fail(f'{label} over budget: {"; ".join(problems)}\n'
+                  f'{format_queries(captured)}')
+
+
+def query_budget(queries=None, db_ms=None, wall_ms=None,
+                 using=(DEFAULT_DB_ALIAS,)):
+    """Decorator: the whole test method has to stay within the budget."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            budget = Budget(queries, db_ms, wall_ms)
+            with budget_check(self, budget, method.__name__, using):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class QueryBudgetMixin:
+    """TestCase mixin with per-endpoint budgets.
+
+    query_budgets is keyed by endpoint, named like core.middleware does.
+    """
+    query_budgets = {}
+    budget_databases = (DEFAULT_DB_ALIAS,)
+
+    def assertBudget(self, queries=None, db_ms=None, wall_ms=None,
+                     label='block'):
+        return budget_check(self, Budget(queries, db_ms, wall_ms), label,
+                            self.budget_databases)
+
+    def request_within_budget(self, method, url, *args, endpoint=None,
+                              **kwargs):
+        """self.client.<method>(url, ...) within query_budgets[endpoint]."""
+        if endpoint is None:
+            endpoint = endpoint_name(resolve(url.split('?')[0]), method)
+        budget = self.query_budgets.get(endpoint)
+        if budget is None:
+            self.fail(f'no budget set for {endpoint}')
+        with budget_check(self, budget, endpoint, self.budget_databases):
+            return getattr(self.client, method)(url, *args, **kwargs)
@@ -0,0 +1,84 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.authentication import local_tokens, shared_key
+
+TAGS_URL = reverse('recipe:tag-list')
+ME_URL = reverse('user:me')
+LOGOUT_URL = reverse('user:logout')
+LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+
+class CachedTokenAuthTests(TestCase):
+    def setUp(self):
+        local_tokens.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_request_skips_token_lookup(self):
+        self.client.get(ME_URL)
+        # only the profile row itself, which /me always reads fresh
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_bad_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_drops_token(self):
+        self.client.get(TAGS_URL)
+        res = self.client.post(LOGOUT_URL)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_drops_cached_user(self):
+        self.client.get(TAGS_URL)
+        res = self.client.patch(ME_URL, {'password': 'newPass'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(local_tokens.get(self.token.key))
+
+    def test_deactivated_user_rejected(self):
+        self.client.get(TAGS_URL)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(
+        CACHES={'shared': LOCMEM, 'default': LOCMEM},
+        TOKEN_CACHE_ALIAS='shared',
+    )
+    def test_shared_tier(self):
+        self.client.get(TAGS_URL)
+        self.assertIsNotNone(caches['shared'].get(shared_key(self.token.key)))
+        # no per-process copy that another worker's logout couldn't reach
+        self.assertIsNone(local_tokens.get(self.token.key))
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+        key = self.token.key
+        self.token.delete()
+        self.assertIsNone(caches['shared'].get(shared_key(key)))
+
+    @override_settings(
+        CACHES={'shared': LOCMEM, 'default': LOCMEM},
+        TOKEN_CACHE_ALIAS='shared',
+    )
+    def test_shared_tier_sees_other_workers_logout(self):
+        self.client.get(TAGS_URL)
+        # what another worker's logout leaves behind: no row, no shared entry
+        Token.objects.filter(pk=self.token.pk).delete()
+        caches['shared'].delete(shared_key(self.token.key))
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,90 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.backends import HashPool, LoginBusy
+from core.hashers import ScryptPasswordHasher
+
+TOKEN_URL = reverse('user:token')
+
+
+class CheapScrypt(ScryptPasswordHasher):
+    work_factor = 2 ** 4
+
+
+class ScryptHasherTests(SimpleTestCase):
+    def test_roundtrip(self):
+        hasher = CheapScrypt()
+        encoded = hasher.encode('secret', hasher.salt())
+        self.assertTrue(encoded.startswith('scrypt$16$'))
+        self.assertTrue(hasher.verify('secret', encoded))
+        self.assertFalse(hasher.verify('wrong', encoded))
+        self.assertFalse(hasher.must_update(encoded))
+        self.assertTrue(ScryptPasswordHasher().must_update(encoded))
+
+
+class HashPoolTests(SimpleTestCase):
+    def test_full_pool_refuses(self):
+        pool = HashPool(workers=1, queue=0, timeout=5)
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        def login():
+            self.assertEqual(pool.run(slow), 'done')
+
+        thread = threading.Thread(target=login)
+        thread.start()
+        started.wait(5)
+        with self.assertRaises(LoginBusy):
+            pool.run(lambda: None)
+        release.set()
+        thread.join()
+        self.assertEqual(pool.run(lambda: 'free again'), 'free again')
+
+    def test_timeout(self):
+        pool = HashPool(workers=1, queue=0, timeout=0.01)
+        release = threading.Event()
+        with self.assertRaises(LoginBusy):
+            pool.run(release.wait, 5)
+        release.set()
+
+
+class PooledBackendTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+
+    @override_settings(PASSWORD_HASHERS=[
+        'core.tests.test_backends.CheapScrypt',
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    ])
+    def test_rehash_on_login(self):
+        self.user.password = make_password('123456', hasher='pbkdf2_sha256')
+        self.user.save()
+
+        self.assertEqual(
+            authenticate(email='test@gmail.com', password='123456'),
+            self.user)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$16$'))
+        self.assertIsNone(
+            authenticate(email='test@gmail.com', password='wrong'))
+        self.assertIsNone(
+            authenticate(email='nobody@gmail.com', password='123456'))
+
+    def test_busy_login_is_503(self):
+        with patch('core.backends.hash_pool.run', side_effect=LoginBusy):
+            res = APIClient().post(
+                TOKEN_URL, {'email': 'test@gmail.com', 'password': '123456'})
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
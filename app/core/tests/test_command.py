@@ -1,10 +1,20 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from core.management.commands.seed_bench_data import generate
+from core.models import Recipe, Tag
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -29,3 +39,131 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class ImportRecipesTests(TestCase):
+    """Test the import_recipes command."""
+
+    def write_file(self, suffix, text):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_jsonl(self):
+        user = get_user_model().objects.create_user(
+            email='a@example.com', password='123456')
+        Tag.objects.create(user=user, name='Quick')
+        records = [
+            {'user': 'a@example.com', 'title': 'Soup', 'time_minutes': 10,
+             'price': '1.50', 'tags': ['Quick', {'name': 'Vegan'}],
+             'ingredients': ['Water']},
+            {'user': 'a@example.com', 'title': 'Salad', 'time_minutes': 5,
+             'price': 2, 'tags': ['Quick']},
+            {'user': 'a@example.com', 'title': 'Broken'},
+            {'user': 'nobody@example.com', 'title': 'Orphan',
+             'time_minutes': 5, 'price': 2},
+        ]
+        path = self.write_file(
+            '.jsonl', '\n'.join(json.dumps(r) for r in records))
+        out = StringIO()
+
+        call_command('import_recipes', path, batch_size=1, stdout=out)
+
+        self.assertIn('Imported 2 recipes', out.getvalue())
+        self.assertIn('skipped 2 bad records', out.getvalue())
+        self.assertIn('skipped 1 records: unknown user nobody@example.com',
+                      out.getvalue())
+        soup = Recipe.objects.get(title='Soup')
+        self.assertEqual(set(soup.tags.values_list('name', flat=True)),
+                         {'Quick', 'Vegan'})
+        self.assertEqual(Tag.objects.filter(user=user).count(), 2)
+        self.assertFalse(Recipe.objects.filter(title='Orphan').exists())
+
+    def test_import_csv_create_users(self):
+        path = self.write_file('.csv', (
+            'user,title,time_minutes,price,description,tags,ingredients\n'
+            'b@example.com,Stew,60,3.00,Slow,Dinner|Winter,Beef\n'
+        ))
+
+        call_command(
+            'import_recipes', path, create_users=True, stdout=StringIO())
+
+        stew = Recipe.objects.get(title='Stew', user__email='b@example.com')
+        self.assertEqual(stew.description, 'Slow')
+        self.assertEqual(stew.tags.count(), 2)
+        self.assertEqual(stew.ingredients.get().name, 'Beef')
+        self.assertFalse(stew.user.has_usable_password())
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY needs Postgres')
+    def test_import_with_copy(self):
+        get_user_model().objects.create_user(
+            email='a@example.com', password='123456')
+        records = [
+            {'title': 'Soup', 'time_minutes': 10, 'price': '1.50',
+             'tags': ['Quick'], 'ingredients': ['Water']},
+            {'title': 'Salad', 'time_minutes': 5, 'price': 2,
+             'description': 'Crisp', 'tags': ['Quick']},
+        ]
+        path = self.write_file(
+            '.jsonl', '\n'.join(json.dumps(r) for r in records))
+        out = StringIO()
+
+        call_command('import_recipes', path, user='a@example.com', stdout=out)
+
+        self.assertIn('Imported 2 recipes', out.getvalue())
+        soup = Recipe.objects.get(title='Soup')
+        self.assertEqual(soup.description, '')
+        self.assertEqual(soup.image.name, '')
+        self.assertEqual(soup.thumbnail.name, '')
+        self.assertEqual(soup.ingredients.get().name, 'Water')
+        quick = Tag.objects.get(name='Quick')
+        self.assertEqual(quick.recipe_set.count(), 2)
+
+    def test_rows_over_the_column_limits_skipped(self):
+        get_user_model().objects.create_user(
+            email='a@example.com', password='123456')
+        good = {'title': 'Soup', 'time_minutes': 10, 'price': '1.50'}
+        records = [
+            good,
+            dict(good, price='123.45'),
+            dict(good, price='1.555'),
+            dict(good, price='NaN'),
+            dict(good, title='x' * 256),
+            dict(good, tags=['t' * 101]),
+        ]
+        path = self.write_file(
+            '.jsonl', '\n'.join(json.dumps(r) for r in records))
+        out = StringIO()
+
+        call_command('import_recipes', path, user='a@example.com', stdout=out)
+
+        self.assertIn('Imported 1 recipes', out.getvalue())
+        self.assertIn('skipped 5 bad records', out.getvalue())
+
+
+class BenchQueryPlansTests(TestCase):
+    def test_seeded_rows_rolled_back(self):
+        out = StringIO()
+        call_command('bench_query_plans', users=2, recipes=3, names=2,
+                     stdout=out)
+        self.assertIn('current: recipe list', out.getvalue())
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_keep(self):
+        call_command('bench_query_plans', users=2, recipes=3, names=2,
+                     keep=True, stdout=StringIO())
+        self.assertEqual(Recipe.objects.count(), 6)
+
+    @patch('core.management.commands.seed_bench_data.BATCH_SIZE', 4)
+    def test_seeded_in_batches(self):
+        owners = generate(3, 5, 2, per_recipe=1)
+
+        for owner in owners:
+            recipes = Recipe.objects.filter(user=owner)
+            self.assertEqual(recipes.count(), 5)
+            self.assertFalse(recipes.exclude(tags__user=owner).exists())
+            self.assertFalse(
+                recipes.exclude(ingredients__user=owner).exists())
@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class RecipeCountTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.thai = Tag.objects.create(user=self.user, name='Thai')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def counts(self):
+        self.thai.refresh_from_db()
+        self.quick.refresh_from_db()
+        self.salt.refresh_from_db()
+        self.user.refresh_from_db()
+        return (self.thai.recipe_count, self.quick.recipe_count,
+                self.salt.recipe_count, self.user.recipe_count)
+
+    def recipe(self, title='Soup'):
+        return Recipe.objects.create(
+            user=self.user, title=title, time_minutes=5, price=1)
+
+    def test_add_remove_clear(self):
+        soup, curry = self.recipe(), self.recipe('Curry')
+        soup.tags.add(self.thai, self.quick)
+        curry.tags.add(self.thai)
+        soup.ingredients.add(self.salt)
+        self.assertEqual(self.counts(), (2, 1, 1, 2))
+
+        soup.tags.remove(self.quick)
+        self.assertEqual(self.counts(), (2, 0, 1, 2))
+
+        self.thai.recipe_set.clear()
+        soup.ingredients.clear()
+        self.assertEqual(self.counts(), (0, 0, 0, 2))
+
+    def test_reverse_add(self):
+        soup, curry = self.recipe(), self.recipe('Curry')
+        self.thai.recipe_set.add(soup, curry)
+        self.thai.recipe_set.remove(curry)
+        self.assertEqual(self.counts(), (1, 0, 0, 2))
+
+    def test_delete_recipe(self):
+        soup = self.recipe()
+        soup.tags.add(self.thai)
+        soup.ingredients.add(self.salt)
+        Recipe.objects.filter(pk=soup.pk).delete()
+        self.assertEqual(self.counts(), (0, 0, 0, 0))
+
+    def test_bulk_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        soup = self.recipe()
+        soup.tags.add(self.quick)
+        res = client.post(BULK_URL, {
+            'create': [{'title': 'A', 'time_minutes': 1, 'price': '1.00',
+                        'tags': [{'name': 'Thai'}]}],
+            'update': [{'id': soup.id, 'tags': [{'name': 'Thai'}],
+                        'ingredients': [{'name': 'Salt'}]}],
+        }, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.counts(), (2, 0, 1, 2))
+
+    def test_bulk_delete_counts_set_wise(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.recipe('Keep').tags.add(self.thai)
+        queries = []
+        for size in (2, 8):
+            recipes = [self.recipe(f'R{n}') for n in range(size)]
+            for recipe in recipes:
+                recipe.tags.add(self.thai, self.quick)
+                recipe.ingredients.add(self.salt)
+            with CaptureQueriesContext(connection) as ctx:
+                res = client.post(
+                    BULK_URL, {'delete': [r.id for r in recipes]},
+                    format='json')
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(self.counts(), (1, 0, 0, 1))
+            queries.append(len(ctx.captured_queries))
+        # one update per counted model, however many recipes go
+        self.assertEqual(queries[0], queries[1])
+
+    def test_reconcile_command(self):
+        soup = self.recipe()
+        soup.tags.add(self.thai)
+        Tag.objects.update(recipe_count=7)
+        get_user_model().objects.update(recipe_count=0)
+
+        out = StringIO()
+        call_command('reconcile_counts', stdout=out)
+
+        self.assertIn('Tag: 2 fixed', out.getvalue())
+        self.assertIn('User: 1 fixed', out.getvalue())
+        self.assertEqual(self.counts(), (1, 0, 0, 1))
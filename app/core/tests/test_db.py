@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock, patch
+
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import db
+
+HEALTH_URL = reverse('health')
+
+
+def fake_connection(last_used, usable=True):
+    conn = MagicMock(connection=object(), last_used=last_used,
+                     in_atomic_block=False)
+    conn.is_usable.return_value = usable
+    return conn
+
+
+@override_settings(DB_HEALTH_CHECK_IDLE=10)
+@patch('core.db.time.monotonic', return_value=100.0)
+class HealthCheckTests(SimpleTestCase):
+    def setUp(self):
+        db.reset_stats()
+
+    def check(self, *conns):
+        with patch('core.db.connections') as patched:
+            patched.all.return_value = list(conns)
+            db.check_connections()
+
+    def test_recently_used_not_pinged(self, _):
+        conn = fake_connection(last_used=95.0)
+        self.check(conn)
+        conn.is_usable.assert_not_called()
+        self.assertEqual(db.connection_stats()['reused'], 1)
+
+    def test_idle_unusable_closed(self, _):
+        conn = fake_connection(last_used=50.0, usable=False)
+        self.check(conn)
+        conn.close.assert_called_once()
+        stats = db.connection_stats()
+        self.assertEqual((stats['health_checks'], stats['unusable']), (1, 1))
+
+    def test_idle_usable_kept(self, _):
+        conn = fake_connection(last_used=50.0)
+        self.check(conn)
+        conn.close.assert_not_called()
+
+    def test_no_open_connection(self, _):
+        conn = MagicMock(connection=None)
+        self.check(conn)
+        stats = db.connection_stats()
+        counts = (stats['requests'], stats['reused'], stats['reuse_ratio'])
+        self.assertEqual(counts, (1, 0, 0.0))
+
+
+class HealthViewTests(TestCase):
+    def test_healthy(self):
+        res = APIClient().get(HEALTH_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['databases'], {'default': 'ok'})
+        self.assertIn('reuse_ratio', res.data['connections'])
+
+    def test_database_down(self):
+        with patch('django.db.backends.utils.CursorWrapper.execute',
+                   side_effect=DatabaseError):
+            res = APIClient().get(HEALTH_URL)
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -0,0 +1,99 @@
+import asyncio
+from decimal import Decimal
+
+from asgiref.sync import SyncToAsync
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.test import (
+    AsyncClient, SimpleTestCase, TestCase, override_settings,
+)
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+def series(name, endpoint):
+    items = metrics.histograms().get(name, [])
+    items += metrics.counters().get(name, [])
+    for item in items:
+        if item['labels'].get('endpoint') == endpoint:
+            return item
+    return None
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_records_viewset_action(self):
+        Recipe.objects.create(user=self.user, title='Soup', time_minutes=5,
+                              price=Decimal('1.00'))
+        res = self.client.get(RECIPES_URL, {'page_size': 10})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        def of_list(name):
+            return series(name, 'recipe-list')
+
+        self.assertEqual(of_list('request_duration_seconds')['count'], 1)
+        self.assertGreater(of_list('request_db_queries_total')['value'], 0)
+        self.assertGreater(
+            of_list('request_serializer_seconds_total')['value'], 0)
+        self.assertEqual(
+            of_list('response_size_bytes')['sum'], len(res.content))
+        self.assertRegex(
+            res['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", ser;dur=[\d.]+, '
+            r'total;dur=[\d.]+$')
+
+        self.client.post(
+            RECIPES_URL, {'title': 'Pie', 'time_minutes': 5, 'price': '1.00'})
+        created = series('request_duration_seconds', 'recipe-create')
+        self.assertEqual(created['count'], 1)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_off(self):
+        res = self.client.get(RECIPES_URL)
+        self.assertNotIn('Server-Timing', res)
+
+    def test_metrics_endpoint(self):
+        self.client.get(RECIPES_URL)
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('request_duration_seconds', res.data['histograms'])
+
+        res = self.client.get(METRICS_URL, {'format': 'prometheus'})
+        body = res.content.decode()
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn('# TYPE request_duration_seconds histogram', body)
+        self.assertIn('request_duration_seconds_bucket'
+                      '{endpoint="recipe-list",le="+Inf"} 1', body)
+        self.assertIn(
+            'requests_total{endpoint="recipe-list",status="200"} 1', body)
+
+
+class AsyncInstrumentationTests(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_asgi_chain_stays_async(self):
+        # a sync-only first middleware would put every request on one thread
+        self.assertNotIsInstance(ASGIHandler()._middleware_chain, SyncToAsync)
+
+    def test_records_async_request(self):
+        # rejected on the event loop, without touching the database
+        url = reverse('recipe-async:recipe-list')
+        res = asyncio.run(AsyncClient().get(url))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('total;dur=', res['Server-Timing'])
+        total = metrics.counters()['requests_total']
+        self.assertEqual(sum(item['value'] for item in total), 1)
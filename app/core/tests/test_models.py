@@ -1,4 +1,5 @@
 from django.test import TestCase
+from django.db import IntegrityError
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from core import models
@@ -52,3 +53,11 @@ class ModelTest(TestCase):
         user = create_user(email='test@fci.com', password='123456')
         ing= models.Ingredient.objects.create(user=user, name='tag')
         self.assertEqual(str(ing), ing.name)
+
+    def test_tag_name_unique_per_user(self):
+        user = create_user(email='test@fci.com', password='123456')
+        other = create_user(email='other@fci.com', password='123456')
+        models.Tag.objects.create(user=user, name='tag')
+        models.Tag.objects.create(user=other, name='tag')
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='tag')
@@ -0,0 +1,81 @@
+import datetime
+import io
+import json
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, dumps, iter_json_array
+
+PAYLOAD = [
+    OrderedDict([
+        ('id', 7),
+        ('title', 'Crème brûlée \u2028 \u2029 "quoted" </script>'),
+        ('time_minutes', 45),
+        ('price', '5.50'),
+        ('raw_price', Decimal('5.50')),
+        ('rank', 0.1),
+        ('created', datetime.datetime(
+            2022, 9, 1, 20, 58, 3, 123456, tzinfo=datetime.timezone.utc)),
+        ('day', datetime.date(2022, 9, 1)),
+        ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+        ('tags', [OrderedDict([('id', 1), ('name', 'Thai')])]),
+        ('ingredients', []),
+        ('description', None),
+    ]),
+    {1: 'int key', 'nested': {'ok': True}},
+]
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def assertSameBytes(self, data, media_type=None):
+        self.assertEqual(FastJSONRenderer().render(data, media_type),
+                         JSONRenderer().render(data, media_type))
+
+    def test_same_bytes_as_drf(self):
+        self.assertSameBytes(PAYLOAD)
+
+    def test_same_bytes_without_orjson(self):
+        with patch('core.renderers.orjson', None):
+            self.assertSameBytes(PAYLOAD)
+
+    def test_indent_falls_back(self):
+        self.assertSameBytes(PAYLOAD[1], 'application/json; indent=4')
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_iter_json_array(self):
+        items = [{'id': n} for n in range(7)]
+        body = b''.join(iter_json_array(items, chunk_size=3))
+        self.assertEqual(body, dumps(items))
+        self.assertEqual(b''.join(iter_json_array([], chunk_size=3)), b'[]')
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def parse(self, body, parser=None):
+        return (parser or FastJSONParser()).parse(io.BytesIO(body))
+
+    def test_same_result_as_drf(self):
+        body = json.dumps(
+            {'title': 'Crème', 'price': 5.5, 'tags': [{'name': 'x'}]}).encode()
+        self.assertEqual(self.parse(body), self.parse(body, JSONParser()))
+
+    def test_invalid_json(self):
+        with self.assertRaises(ParseError):
+            self.parse(b'{"title": ')
+
+    def test_nan_rejected(self):
+        with self.assertRaises(ParseError):
+            self.parse(b'{"price": NaN}')
+
+    def test_without_orjson(self):
+        with patch('core.parsers.orjson', None):
+            self.assertEqual(self.parse(b'{"a": [1, 2]}'), {'a': [1, 2]})
@@ -0,0 +1,124 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import routers
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+@override_settings(REPLICA_DATABASES=['replica1', 'replica2'],
+                   REPLICA_RETRY_SECONDS=30)
+class ChooseReplicaTests(SimpleTestCase):
+    def setUp(self):
+        routers._down.clear()
+
+    def test_router_uses_request_choice(self):
+        router = routers.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Recipe))
+        token = routers.current_replica.set('replica1')
+        try:
+            self.assertEqual(router.db_for_read(Recipe), 'replica1')
+            self.assertEqual(router.db_for_write(Recipe), 'default')
+        finally:
+            routers.current_replica.reset(token)
+
+    def test_skips_unreachable_replica(self):
+        with patch('core.routers._reachable',
+                   side_effect=lambda alias: alias == 'replica2'):
+            for _ in range(5):
+                self.assertEqual(routers.choose_replica(), 'replica2')
+
+    def test_down_replica_retried_later(self):
+        with patch('core.routers.connections') as conns:
+            conn = conns.__getitem__.return_value
+            conn.connection = None
+            conn.ensure_connection.side_effect = OperationalError
+            self.assertIsNone(routers.choose_replica())
+            self.assertEqual(set(routers._down), {'replica1', 'replica2'})
+            conn.ensure_connection.reset_mock()
+
+            self.assertIsNone(routers.choose_replica())
+            conn.ensure_connection.assert_not_called()
+
+    @override_settings(REPLICA_DATABASES=['replica1'],
+                       REPLICA_HEALTH_CHECK_SECONDS=60)
+    def test_open_connection_pinged(self):
+        with patch('core.routers.connections') as conns:
+            conn = conns.__getitem__.return_value
+            conn.in_atomic_block = False
+            conn.replica_checked = None
+            self.assertEqual(routers.choose_replica(), 'replica1')
+            conn.is_usable.assert_called_once()
+
+            # checked a moment ago
+            self.assertEqual(routers.choose_replica(), 'replica1')
+            conn.is_usable.assert_called_once()
+
+            # died since
+            conn.replica_checked = None
+            conn.is_usable.return_value = False
+            conn.ensure_connection.side_effect = OperationalError
+            self.assertIsNone(routers.choose_replica())
+            conn.close.assert_called_once()
+            self.assertEqual(set(routers._down), {'replica1'})
+
+
+@override_settings(REPLICA_DATABASES=['replica1'], REPLICA_STICKY_SECONDS=5)
+@patch('core.routers.choose_replica', return_value=None)
+class ReplicaReadMixinTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_read_picks_replica(self, choose):
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        choose.assert_called_once()
+        self.assertIsNone(routers.current_replica.get())
+
+    def test_write_pins_user_to_primary(self, choose):
+        res = self.client.post(
+            RECIPES_URL,
+            {'title': 'Soup', 'time_minutes': 5, 'price': '1.00'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(routers.is_pinned(self.user))
+
+        self.client.get(RECIPES_URL)
+        choose.assert_not_called()
+
+    def test_export_streams_from_the_replica(self, choose):
+        choose.return_value = 'default'
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='1.00')
+        seen = []
+
+        def db_for_read(router, model, **hints):
+            seen.append(routers.current_replica.get())
+            return seen[-1]
+
+        with patch.object(routers.ReplicaRouter, 'db_for_read',
+                          autospec=True, side_effect=db_for_read):
+            res = self.client.get(EXPORT_URL)
+            seen.clear()
+            body = b''.join(res.streaming_content)
+        self.assertIn(b'Soup', body)
+        self.assertEqual(set(seen), {'default'})
+        self.assertIsNone(routers.current_replica.get())
+
+    def test_pin_expires(self, choose):
+        routers.pin(self.user)
+        caches['default'].delete(routers.pin_key(self.user.pk))
+        self.client.get(RECIPES_URL)
+        choose.assert_called_once()
@@ -0,0 +1,53 @@
+import os
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from core.testing import Budget, QueryBudgetMixin, query_budget
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        'tag-list': Budget(queries=1),
+        'tag-destroy': Budget(queries=1),
+    }
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_within_budget(self):
+        res = self.request_within_budget('get', TAGS_URL)
+        self.assertEqual(res.status_code, 200)
+
+    def test_over_budget_lists_sql(self):
+        tag = Tag.objects.create(user=self.user, name='Thai')
+        with self.assertRaises(AssertionError) as ctx:
+            self.request_within_budget(
+                'delete', reverse('recipe:tag-detail', args=[tag.id]))
+        message = str(ctx.exception)
+        self.assertIn('tag-destroy over budget: 3 queries, budget 1', message)
+        self.assertIn('DELETE FROM "core_tag"', message)
+
+    def test_missing_budget(self):
+        with self.assertRaisesRegex(AssertionError,
+                                    'no budget set for user:me'):
+            self.request_within_budget('get', reverse('user:me'))
+
+    @patch.dict(os.environ, {'PERF_BUDGET_WALL_FACTOR': '1'})
+    def test_block_and_wall_clock(self):
+        with self.assertRaisesRegex(AssertionError, 'wall clock'):
+            with self.assertBudget(queries=1, wall_ms=0):
+                Tag.objects.count()
+
+    @query_budget(queries=1)
+    def test_decorator(self):
+        Tag.objects.count()
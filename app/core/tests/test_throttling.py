@@ -0,0 +1,129 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core import metrics
+from core.throttling import (
+    CacheStore, LocalStore, LoginThrottle, UserThrottle, local_store,
+    previous_counts,
+)
+
+TOKEN_URL = reverse('user:token')
+METRICS_URL = reverse('metrics')
+
+
+class ThreePerMinute(UserThrottle):
+    rate = '3/min'
+
+
+class SlidingWindowTests(SimpleTestCase):
+    def setUp(self):
+        local_store.clear()
+        previous_counts.clear()
+        self.request = APIRequestFactory().get('/')
+        self.request.user = None
+
+    def hits(self, at, count=1):
+        results = []
+        for _ in range(count):
+            throttle = ThreePerMinute()
+            with patch.object(throttle, 'timer', return_value=at):
+                results.append(throttle.allow_request(self.request, None))
+        return results, throttle
+
+    def test_limit_within_window(self):
+        results, throttle = self.hits(600, 4)
+        self.assertEqual(results, [True, True, True, False])
+        self.assertAlmostEqual(throttle.wait(), 60)
+
+    def test_previous_window_weighs_in(self):
+        self.hits(630, 3)
+        # a quarter into the next window 75% of the previous 3 still count
+        results, _ = self.hits(675, 5)
+        self.assertEqual(results, [False] * 5)
+        # three quarters in: 0.75 + 1, the refused hits don't count
+        results, _ = self.hits(705)
+        self.assertEqual(results, [True])
+
+    def test_decisions_counted(self):
+        metrics.reset()
+        self.hits(600, 4)
+        values = {tuple(c['labels'].values()): c['value']
+                  for c in metrics.counters()['throttle_decisions']}
+        self.assertEqual(
+            values, {('allowed', 'user'): 3, ('throttled', 'user'): 1})
+
+
+class StoreTests(SimpleTestCase):
+    def test_local_store_expires_and_evicts(self):
+        store = LocalStore(size=2)
+        self.assertEqual([store.incr('a', 60) for _ in range(3)], [1, 2, 3])
+        with patch('core.throttling.time.monotonic', return_value=10 ** 9):
+            self.assertEqual(store.get('a'), 0)
+            self.assertEqual(store.incr('a', 60), 1)
+        store.incr('b', 60)
+        store.incr('c', 60)
+        self.assertEqual(store.get('a'), 0)
+
+    def test_cache_store(self):
+        store = CacheStore(caches['default'])
+        caches['default'].delete('k')
+        self.assertEqual([store.incr('k', 60) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(store.get('k'), 3)
+        store.decr('k')
+        self.assertEqual(store.get('k'), 2)
+        store.decr('missing')
+        self.assertEqual(store.get('missing'), 0)
+
+    def test_local_store_decr(self):
+        store = LocalStore(size=2)
+        store.incr('a', 60)
+        store.incr('a', 60)
+        store.decr('a')
+        self.assertEqual(store.get('a'), 1)
+        store.decr('missing')
+        self.assertEqual(store.get('missing'), 0)
+
+
+class ThrottledEndpointTests(TestCase):
+    def setUp(self):
+        local_store.clear()
+        previous_counts.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+
+    def test_login_throttled(self):
+        client = APIClient()
+        payload = {'email': 'test@gmail.com', 'password': 'wrong'}
+        with patch.object(LoginThrottle, 'rate', '2/min', create=True):
+            codes = [client.post(TOKEN_URL, payload).status_code
+                     for _ in range(3)]
+        self.assertEqual(codes, [400, 400, status.HTTP_429_TOO_MANY_REQUESTS])
+
+    @override_settings(THROTTLE_CACHE_ALIAS='default')
+    def test_shared_store(self):
+        caches['default'].clear()
+        client = APIClient()
+        with patch.object(LoginThrottle, 'rate', '1/min', create=True):
+            client.post(
+                TOKEN_URL, {'email': 'test@gmail.com', 'password': 'wrong'})
+            res = client.post(
+                TOKEN_URL, {'email': 'test@gmail.com', 'password': '123456'})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    def test_metrics_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        res = client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        res = client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('counters', res.data)
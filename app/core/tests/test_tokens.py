@@ -0,0 +1,140 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import tokens
+
+TAGS_URL = reverse('recipe:tag-list')
+ME_URL = reverse('user:me')
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+LOGOUT_URL = reverse('user:logout')
+
+
+class TokenTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+
+    def test_issue_and_verify(self):
+        token, expires = tokens.issue(self.user)
+        claims = tokens.verify(token)
+        self.assertEqual(claims['u'], self.user.pk)
+        self.assertEqual(claims['e'], expires)
+
+    def test_tampered(self):
+        token, _ = tokens.issue(self.user)
+        with self.assertRaises(tokens.InvalidToken):
+            tokens.verify(token[:-2] + 'xx')
+
+    @override_settings(SIGNED_TOKEN_TTL=60)
+    def test_expired(self):
+        token, _ = tokens.issue(self.user)
+        with patch('core.tokens.time.time', return_value=time.time() + 61):
+            with self.assertRaisesMessage(tokens.InvalidToken, 'expired'):
+                tokens.verify(token)
+
+    def test_key_rotation(self):
+        with override_settings(TOKEN_SIGNING_KEYS=['old']):
+            token, _ = tokens.issue(self.user)
+        with override_settings(TOKEN_SIGNING_KEYS=['new', 'old']):
+            self.assertEqual(tokens.verify(token)['u'], self.user.pk)
+        with override_settings(TOKEN_SIGNING_KEYS=['new']):
+            with self.assertRaises(tokens.InvalidToken):
+                tokens.verify(token)
+
+    def test_password_change_revokes(self):
+        # all within the same second
+        token, _ = tokens.issue(self.user)
+        self.user.set_password('654321')
+        self.user.save()
+        with self.assertRaisesMessage(tokens.InvalidToken, 'revoked'):
+            tokens.verify(token)
+        fresh, _ = tokens.issue(self.user)
+        self.assertEqual(tokens.verify(fresh)['u'], self.user.pk)
+
+    def test_plain_save_keeps_tokens(self):
+        token, _ = tokens.issue(self.user)
+        self.user.name = 'Renamed'
+        self.user.save()
+        tokens.verify(token)
+
+
+@override_settings(TOKEN_MODE='signed')
+class SignedTokenApiTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.client = APIClient()
+
+    def login(self):
+        res = self.client.post(
+            TOKEN_URL, {'email': 'test@gmail.com', 'password': '123456'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('expires', res.data)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {res.data["token"]}')
+        return res.data['token']
+
+    def status_of(self, url):
+        return self.client.get(url).status_code
+
+    def test_login_writes_nothing(self):
+        self.login()
+        self.assertFalse(Token.objects.exists())
+
+    def test_authenticated_request_skips_user_lookup(self):
+        self.login()
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_me_loads_full_user(self):
+        self.login()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['email'], 'test@gmail.com')
+
+    def test_logout_denies_token(self):
+        self.login()
+        res = self.client.post(LOGOUT_URL)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh(self):
+        old = self.login()
+        res = self.client.post(REFRESH_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], old)
+        self.assertEqual(
+            self.status_of(TAGS_URL), status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {res.data["token"]}')
+        self.assertEqual(self.status_of(TAGS_URL), status.HTTP_200_OK)
+
+    def test_deleted_user(self):
+        self.login()
+        self.user.delete()
+        self.assertEqual(
+            self.status_of(TAGS_URL), status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.status_of(ME_URL), status.HTTP_401_UNAUTHORIZED)
+
+    def test_me_with_user_deactivated_behind_the_signals(self):
+        self.login()
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False)
+        self.assertEqual(self.status_of(ME_URL), status.HTTP_401_UNAUTHORIZED)
+
+    def test_database_tokens_still_accepted(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.status_of(TAGS_URL), status.HTTP_200_OK)
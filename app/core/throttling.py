@@ -0,0 +1,177 @@
+"""
+Sliding-window throttles with a pluggable counter store.
+
+Each client gets a counter per fixed window. The request rate is estimated
+from the current window's count plus the previous window's count weighted
+by how much of it still overlaps the sliding window (Cloudflare's "sliding
+window counter"). The current count comes back from a single atomic incr,
+and the previous window's final count is read once and then remembered in
+process, so a check costs one cache round trip. A refused request takes its
+hit back with decr, so clients that keep retrying are not locked out for
+longer than the rate says.
+
+Counters live in the process (LocalStore) unless THROTTLE_CACHE_ALIAS
+names a cache shared by all workers (CacheStore). Any object with the same
+incr/decr/get methods can be used as a store.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from core import metrics
+from core.authentication import LRUCache
+
+
+class LocalStore:
+    """Counters in this process.
+
+    Past `size` keys the least recently used one is dropped.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._data.get(key, (0, 0))
+            if expires <= now:
+                value, expires = 0, now + ttl
+            self._data[key] = (value + 1, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+            return value + 1
+
+    def decr(self, key):
+        with self._lock:
+            value, expires = self._data.get(key, (0, 0))
+            if value and expires > time.monotonic():
+                self._data[key] = (value - 1, expires)
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._data.get(key, (0, 0))
+        return value if expires > time.monotonic() else 0
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class CacheStore:
+    """Counters in a Django cache; incr is atomic on memcached and redis."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def incr(self, key, ttl):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # first hit in this window
+            if self.cache.add(key, 1, ttl):
+                return 1
+            return self.cache.incr(key)
+
+    def decr(self, key):
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            # the window expired in between
+            pass
+
+    def get(self, key):
+        return self.cache.get(key, 0)
+
+
+local_store = LocalStore(getattr(settings, 'THROTTLE_LOCAL_SIZE', 100000))
+# final counts of finished windows, they don't change anymore
+previous_counts = LRUCache(
+    getattr(settings, 'THROTTLE_LOCAL_SIZE', 100000), 3600)
+
+
+def get_store():
+    alias = getattr(settings, 'THROTTLE_CACHE_ALIAS', None)
+    return CacheStore(caches[alias]) if alias else local_store
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Base class; subclasses set `scope` and implement get_cache_key."""
+
+    def get_rate(self):
+        # read the live settings, DRF binds THROTTLE_RATES at import time
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"No default throttle rate set for '{self.scope}' scope")
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        store = get_store()
+        position = self.timer() / self.duration
+        window = int(position)
+        self.elapsed = position - window
+        current_key = f'{self.key}:{window}'
+        self.current = store.incr(current_key, self.duration * 2)
+        previous_key = f'{self.key}:{window - 1}'
+        self.previous = previous_counts.get(previous_key)
+        if self.previous is None:
+            self.previous = store.get(previous_key)
+            previous_counts.set(previous_key, self.previous)
+
+        weighted = self.previous * (1 - self.elapsed) + self.current
+        allowed = weighted <= self.num_requests
+        if not allowed:
+            # only requests that get through count; wait() still goes by
+            # self.current, what the next request would make of it
+            store.decr(current_key)
+        metrics.inc('throttle_decisions', scope=self.scope,
+                    result='allowed' if allowed else 'throttled')
+        return allowed
+
+    def wait(self):
+        if self.current > self.num_requests or not self.previous:
+            # nothing to do but wait for the window to roll over
+            return (1 - self.elapsed) * self.duration
+        needed = 1 - (self.num_requests - self.current) / self.previous
+        return max(0.0, (needed - self.elapsed) * self.duration)
+
+
+class UserThrottle(SlidingWindowThrottle):
+    """Per user, anonymous requests are counted per IP."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return f'throttle:{self.scope}:{ident}'
+
+
+class IPThrottle(SlidingWindowThrottle):
+    """Per client IP, whoever is logged in."""
+    scope = 'ip'
+
+    def get_cache_key(self, request, view):
+        return f'throttle:{self.scope}:{self.get_ident(request)}'
+
+
+class LoginThrottle(IPThrottle):
+    """Tighter per-IP limit for the endpoints that hash passwords."""
+    scope = 'login'
@@ -0,0 +1,128 @@
+"""
+Signed, expiring API tokens that are verified without a database lookup.
+
+A token is the signed JSON {'u': user id, 'i': issued at (microseconds),
+'e': expires at (seconds), 'j': random id}. It is signed with the first of
+TOKEN_SIGNING_KEYS and checked against all of them, so keys can be rotated
+by putting a new one first and dropping the old one after SIGNED_TOKEN_TTL.
+
+Revocation goes through a denylist in the TOKEN_DENYLIST_ALIAS cache, which
+has to be shared by all workers:
+
+* one entry per logged out or refreshed token, kept only until the token
+  would have expired anyway;
+* one entry per user whose password changed, who was deactivated or who
+  was deleted, revoking every token issued before that moment.
+
+Those come from model signals (core.signals), so deactivate users through
+save(); a queryset update() leaves their tokens valid until they expire.
+
+Checking both is a single get_many.
+"""
+import secrets
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+
+SALT = 'core.tokens'
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def signing_keys():
+    return (getattr(settings, 'TOKEN_SIGNING_KEYS', None)
+            or [settings.SECRET_KEY])
+
+
+def denylist():
+    return caches[getattr(settings, 'TOKEN_DENYLIST_ALIAS', 'default')]
+
+
+def ttl():
+    return getattr(settings, 'SIGNED_TOKEN_TTL', 86400)
+
+
+def deny_key(jti):
+    return f'token-deny:{jti}'
+
+
+def revoked_key(user_id):
+    return f'token-revoked:{user_id}'
+
+
+def issue(user):
+    """Return (token, expiry timestamp) for user."""
+    now = time.time_ns() // 1000
+    claims = {
+        'u': user.pk,
+        'i': now,
+        'e': now // 10 ** 6 + ttl(),
+        'j': secrets.token_urlsafe(9),
+    }
+    return signing.dumps(claims, key=signing_keys()[0], salt=SALT), claims['e']
+
+
+def verify(token):
+    """The claims of a valid, unexpired and not revoked token.
+
+    Raises InvalidToken otherwise.
+    """
+    for key in signing_keys():
+        try:
+            claims = signing.loads(token, key=key, salt=SALT)
+            break
+        except signing.BadSignature:
+            continue
+    else:
+        raise InvalidToken('Invalid token.')
+    if claims['e'] <= time.time():
+        raise InvalidToken('Token has expired.')
+
+    denied_key, revoked = deny_key(claims['j']), revoked_key(claims['u'])
+    denied = denylist().get_many([denied_key, revoked])
+    if denied_key in denied or claims['i'] < denied.get(revoked, 0):
+        raise InvalidToken('Token has been revoked.')
+    return claims
+
+
+def deny(claims):
+    """Revoke one token until it expires on its own."""
+    remaining = int(claims['e'] - time.time()) + 1
+    if remaining > 0:
+        denylist().set(deny_key(claims['j']), 1, remaining)
+
+
+def revoke_user(user_id):
+    """Revoke every token of user issued before now."""
+    # microseconds, like 'i': a token issued in the same second is still older
+    denylist().set(revoked_key(user_id), time.time_ns() // 1000, ttl())
+
+
+def token_user(user_id):
+    """A user instance with only the pk loaded.
+
+    Other fields are read from the database on access.
+    """
+    User = get_user_model()
+    return User.from_db('default', [User._meta.pk.attname], [user_id])
+
+
+class SignedToken:
+    """request.auth for signed tokens.
+
+    delete() revokes it, like Token.delete() does for database tokens.
+    """
+
+    def __init__(self, token, claims):
+        self.key = token
+        self.claims = claims
+        self.user_id = claims['u']
+        self.expires = claims['e']
+
+    def delete(self):
+        deny(self.claims)
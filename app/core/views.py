@@ -0,0 +1,75 @@
+import posixpath
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import Http404
+from django.views import static
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import metrics
+from core.authentication import (
+    CachedTokenAuthentication, SignedTokenAuthentication,
+)
+from core.db import connection_stats
+from core.renderers import FastJSONRenderer, PrometheusRenderer
+
+
+class HealthView(APIView):
+    """Liveness of every configured database, plus connection reuse stats."""
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = []
+
+    def get(self, request):
+        databases = {}
+        for alias in connections:
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                databases[alias] = 'ok'
+            except DatabaseError:
+                databases[alias] = 'unavailable'
+        if all(state == 'ok' for state in databases.values()):
+            code = status.HTTP_200_OK
+        else:
+            code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return Response(
+            {'databases': databases, 'connections': connection_stats()},
+            status=code,
+        )
+
+
+class MetricsView(APIView):
+    """Metrics of this worker process, for staff and scrapers with a token.
+
+    ?format=prometheus returns the Prometheus text format.
+    """
+    authentication_classes = [
+        SignedTokenAuthentication, CachedTokenAuthentication,
+    ]
+    permission_classes = [permissions.IsAdminUser]
+    throttle_classes = []
+    renderer_classes = [FastJSONRenderer, PrometheusRenderer]
+
+    def get(self, request):
+        return Response({
+            'counters': metrics.counters(),
+            'histograms': metrics.histograms(),
+        })
+
+
+def serve_media(request, path):
+    """Recipe images under MEDIA_ROOT, for SERVE_MEDIA deployments.
+
+    The names are content hashes, so a response never goes stale. Uploads in
+    progress (MEDIA_ROOT/tmp) are not served.
+    """
+    # normalize before the prefix check, `recipes/../tmp/x` is `tmp/x`
+    path = posixpath.normpath(path)
+    if path.startswith(('/', '..')) or not path.startswith('recipes/'):
+        raise Http404
+    response = static.serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
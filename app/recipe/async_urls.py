@@ -0,0 +1,25 @@
+from django.urls import path
+from core.async_views import offload_view
+from recipe import views
+
+app_name = 'recipe-async'
+
+
+def viewset_view(viewset, actions, basename):
+    return offload_view(viewset.as_view(actions, basename=basename))
+
+
+urlpatterns = [
+    path('recipes/',
+         viewset_view(views.RecipeViewSet, {'get': 'list'}, 'recipe'),
+         name='recipe-list'),
+    path('recipes/<int:pk>/',
+         viewset_view(views.RecipeViewSet, {'get': 'retrieve'}, 'recipe'),
+         name='recipe-detail'),
+    path('tags/',
+         viewset_view(views.TagViewSet, {'get': 'list'}, 'tag'),
+         name='tag-list'),
+    path('ingredients/',
+         viewset_view(views.IngredientViewSet, {'get': 'list'}, 'ingredient'),
+         name='ingredient-list'),
+]
@@ -0,0 +1,190 @@
+"""
+Batch create/update/delete of recipes for RecipeViewSet.bulk.
+
+Tag and ingredient names of the whole batch are resolved with one lookup
+per model, recipes are written with bulk_create/bulk_update and the M2M
+rows with one insert (and at most one delete) per join table. Those
+writes skip model signals, so the recipe counts are adjusted here.
+"""
+from django.db import connection, transaction
+from rest_framework import status
+
+from core.counters import (
+    add_counts, add_links, counted_in_bulk, uncount_recipes,
+)
+from core.models import Recipe, Tag, Ingredient
+from recipe.caching import bump_version
+from recipe.serializers import (
+    RecipeDetailSerializer, get_or_create_many, lock_user,
+)
+
+M2M = (('tags', Tag), ('ingredients', Ingredient))
+M2M_FIELDS = {field for field, _ in M2M}
+# result for a valid item that wasn't written because another one failed
+NOT_APPLIED = status.HTTP_424_FAILED_DEPENDENCY
+
+
+def bulk_write(user, create=(), update=(), delete=(), atomic=True):
+    """Apply a batch for user and return (per-item results, HTTP status).
+
+    With atomic=True nothing is written unless every item is valid;
+    otherwise the valid items are written and the rest reported.
+    """
+    results = {'create': [], 'update': [], 'delete': []}
+
+    creates = []
+    for item in create:
+        serializer = RecipeDetailSerializer(data=item)
+        if serializer.is_valid():
+            creates.append(serializer.validated_data)
+            results['create'].append({'status': status.HTTP_201_CREATED})
+        else:
+            results['create'].append({
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': serializer.errors,
+            })
+
+    # not isinstance: True and False are ints, and equal to 1 and 0
+    ids = [item.get('id') for item in update]
+    instances = Recipe.objects.filter(user=user).in_bulk(
+        [pk for pk in ids if type(pk) is int])
+    updates = []
+    for pk, item in zip(ids, update):
+        instance = instances.get(pk) if type(pk) is int else None
+        if instance is None:
+            results['update'].append(
+                {'id': pk, 'status': status.HTTP_404_NOT_FOUND})
+            continue
+        serializer = RecipeDetailSerializer(instance, data=item, partial=True)
+        if serializer.is_valid():
+            updates.append((instance, serializer.validated_data))
+            results['update'].append({'id': pk, 'status': status.HTTP_200_OK})
+        else:
+            results['update'].append({
+                'id': pk,
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': serializer.errors,
+            })
+
+    existing = set(Recipe.objects.filter(user=user, id__in=delete)
+                   .values_list('id', flat=True))
+    for pk in delete:
+        if pk in existing:
+            code = status.HTTP_204_NO_CONTENT
+        else:
+            code = status.HTTP_404_NOT_FOUND
+        results['delete'].append({'id': pk, 'status': code})
+
+    failed = any(
+        r['status'] >= 400 for items in results.values() for r in items)
+    if failed and atomic:
+        for items in results.values():
+            for r in items:
+                if r['status'] < 400:
+                    r['status'] = NOT_APPLIED
+        return results, status.HTTP_400_BAD_REQUEST
+
+    with transaction.atomic():
+        lock_user(user)
+        names = _resolve_names(user, creates + [data for _, data in updates])
+        created = _create(user, creates, names)
+        _update(updates, names)
+        # counted set-wise, not by a pre_delete handler per recipe
+        with counted_in_bulk():
+            uncount_recipes(existing)
+            Recipe.objects.filter(user=user, id__in=existing).delete()
+        bump_version(user.pk)
+
+    created = iter(created)
+    for r in results['create']:
+        if r['status'] == status.HTTP_201_CREATED:
+            r['id'] = next(created).pk
+    if failed:
+        return results, status.HTTP_207_MULTI_STATUS
+    return results, status.HTTP_200_OK
+
+
+def _resolve_names(user, items):
+    """{field: {name: obj}} for every tag/ingredient named in items."""
+    names = {}
+    for field, model in M2M:
+        wanted = [obj['name'] for data in items for obj in data.get(field, [])]
+        names[field] = {
+            obj.name: obj for obj in get_or_create_many(model, user, wanted)}
+    return names
+
+
+def _link_rows(field, pairs):
+    through = getattr(Recipe, field).through
+    column = Recipe._meta.get_field(field).m2m_reverse_field_name()
+    return [through(recipe_id=recipe_id, **{f'{column}_id': pk})
+            for recipe_id, pk in pairs]
+
+
+def _create(user, creates, names):
+    recipes = [
+        Recipe(user=user,
+               **{k: v for k, v in data.items() if k not in M2M_FIELDS})
+        for data in creates
+    ]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes)
+        add_counts(type(user), {user.pk: len(recipes)})
+    else:
+        # no ids back from a bulk insert on this backend
+        for recipe in recipes:
+            recipe.save()
+
+    for field, model in M2M:
+        pairs = {
+            (recipe.pk, names[field][obj['name']].pk)
+            for recipe, data in zip(recipes, creates)
+            for obj in data.get(field, [])
+        }
+        if pairs:
+            getattr(Recipe, field).through.objects.bulk_create(
+                _link_rows(field, sorted(pairs)))
+            add_links(model, [pk for _, pk in pairs])
+    return recipes
+
+
+def _update(updates, names):
+    fields = set()
+    for instance, data in updates:
+        for key, value in data.items():
+            if key not in M2M_FIELDS:
+                setattr(instance, key, value)
+                fields.add(key)
+    if fields:
+        Recipe.objects.bulk_update(
+            [instance for instance, _ in updates], sorted(fields))
+
+    for field, model in M2M:
+        wanted = {
+            instance.pk: {names[field][obj['name']].pk for obj in data[field]}
+            for instance, data in updates if field in data
+        }
+        if not wanted:
+            continue
+        through = getattr(Recipe, field).through
+        column = Recipe._meta.get_field(field).m2m_reverse_field_name() + '_id'
+        current = {}
+        stale = {}
+        rows = through.objects.filter(recipe_id__in=wanted).values_list(
+            'id', 'recipe_id', column)
+        for row_id, recipe_id, pk in rows:
+            if pk in wanted[recipe_id]:
+                current.setdefault(recipe_id, set()).add(pk)
+            else:
+                stale[row_id] = pk
+        if stale:
+            through.objects.filter(id__in=stale).delete()
+            add_links(model, stale.values(), -1)
+        pairs = [
+            (recipe_id, pk)
+            for recipe_id, pks in wanted.items()
+            for pk in sorted(pks - current.get(recipe_id, set()))
+        ]
+        if pairs:
+            through.objects.bulk_create(_link_rows(field, pairs))
+            add_links(model, [pk for _, pk in pairs])
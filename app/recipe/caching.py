@@ -0,0 +1,91 @@
+"""
+Per-user versioned caching for the recipe API list endpoints.
+
+Every user has a version number in the cache. Any write to that user's
+recipes, tags or ingredients bumps it (see recipe.signals), which orphans
+all cached list responses for the user at once.
+
+Caching is off unless RECIPE_CACHE_ALIAS names a cache shared by all
+workers: with a per-process cache a write would only bump the version in
+the worker that made it, and the others would keep serving (and 304ing)
+stale lists until the entries expire.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def get_cache():
+    """The cache of RECIPE_CACHE_ALIAS, None if list caching is off."""
+    alias = getattr(settings, 'RECIPE_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def version_key(user_id):
+    return f'recipe-version:{user_id}'
+
+
+def get_version(user_id):
+    cache = get_cache()
+    version = cache.get(version_key(user_id))
+    if version is None:
+        # start from the clock, not 1, so an evicted version can't collide
+        # with old entries
+        cache.add(version_key(user_id), time.time_ns(), None)
+        version = cache.get(version_key(user_id))
+    return version
+
+
+def _bump(user_id):
+    cache = get_cache()
+    if cache is None:
+        return
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        cache.set(version_key(user_id), time.time_ns(), None)
+
+
+def bump_version(user_id):
+    """Invalidate user's cached lists now and again once the transaction commits.
+
+    The second bump covers readers that cached the pre-commit data in between.
+    """
+    _bump(user_id)
+    if not transaction.get_autocommit():
+        transaction.on_commit(lambda: _bump(user_id))
+
+
+class CachedListMixin:
+    """Serve `list` from the per-user cache with a strong ETag and 304s."""
+
+    def list(self, request, *args, **kwargs):
+        cache = get_cache()
+        if cache is None:
+            return super().list(request, *args, **kwargs)
+        user_id = request.user.pk
+        key = ':'.join([
+            'recipe-list', str(user_id), str(get_version(user_id)),
+            self.basename, request.accepted_renderer.format,
+            request.get_full_path(),
+        ])
+        etag = '"%s"' % hashlib.md5(key.encode()).hexdigest()
+        headers = {'ETag': etag}
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (etag in parse_etags(if_none_match)
+                              or if_none_match.strip() == '*'):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        data = cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, getattr(settings, 'RECIPE_CACHE_TTL', 300))
+        return Response(data, headers=headers)
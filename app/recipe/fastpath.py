@@ -0,0 +1,91 @@
+"""
+Plain-dict serialization of recipes for read-only responses.
+
+Builds the same output as RecipeSerializer/RecipeDetailSerializer from
+`.values()` rows plus one query per M2M table and chunk, skipping DRF's
+per-object field machinery. Nested tags and ingredients are ordered by id,
+like the prefetch in RecipeViewSet, so the rendered JSON is byte-identical.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import QuerySet
+from rest_framework.response import Response
+
+from core.instrumentation import serializing
+from core.models import Recipe
+
+NESTED = ('tags', 'ingredients')
+FILES = ('image', 'thumbnail')
+
+
+def recipe_dicts(queryset, serializer_class, chunk_size=None):
+    """Yield one dict per recipe in queryset, keyed like the serializer's."""
+    chunk_size = chunk_size or getattr(
+        settings, 'RECIPE_EXPORT_CHUNK_SIZE', 2000)
+    fields = serializer_class.Meta.fields
+    flat = [field for field in fields if field not in NESTED]
+    nested = [field for field in fields if field in NESTED]
+    files = [field for field in fields if field in FILES]
+    price = serializer_class().fields['price']
+    rows = queryset.prefetch_related(None).values(*flat).iterator(
+        chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        related = {field: related_by_recipe(field, ids) for field in nested}
+        for row in chunk:
+            row['price'] = price.to_representation(row['price'])
+            for field in files:
+                # what FileField gives without a request: the relative URL,
+                # or None
+                if row[field]:
+                    row[field] = default_storage.url(row[field])
+                else:
+                    row[field] = None
+            for field in nested:
+                row[field] = related[field].get(row['id'], [])
+            yield {field: row[field] for field in fields}
+
+
+def related_by_recipe(field, recipe_ids):
+    """{recipe id: [{'id', 'name'}]} for the tags or ingredients of recipe_ids.
+
+    One query, however many recipes.
+    """
+    through = getattr(Recipe, field).through
+    column = Recipe._meta.get_field(field).m2m_reverse_field_name()
+    by_recipe = {}
+    rows = (
+        through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by(f'{column}_id')
+        .values_list('recipe_id', f'{column}_id', f'{column}__name')
+    )
+    for recipe_id, pk, name in rows:
+        by_recipe.setdefault(recipe_id, []).append({'id': pk, 'name': name})
+    return by_recipe
+
+
+class FastListMixin:
+    """`list` through recipe_dicts for a plain, unpaginated queryset.
+
+    Paginated pages and ranked search results still go through the serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                self.get_serializer(page, many=True).data)
+        fast = getattr(settings, 'RECIPE_FAST_LIST', True)
+        if isinstance(queryset, QuerySet) and fast:
+            # stands in for the serializer; the time includes its queries
+            with serializing():
+                data = list(
+                    recipe_dicts(queryset, self.get_serializer_class()))
+            return Response(data)
+        return Response(self.get_serializer(queryset, many=True).data)
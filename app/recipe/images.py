@@ -0,0 +1,326 @@
+"""
+Recipe image uploads.
+
+ImageUploadHandler writes the upload straight to a temporary file under
+MEDIA_ROOT while hashing it, so a request holds at most one chunk in memory.
+The byte size is checked against Content-Length up front and again as the
+data streams in, and the format and pixel size are read from the first
+bytes; anything off stops the upload there.
+
+Images are stored under their SHA-256 (recipes/ab/abcd....jpg). The same
+picture uploaded twice is stored once, and a URL never changes content, so
+clients may cache it forever (core.views.serve_media). Thumbnails are named
+after the image and THUMBNAIL_SIZE and made by thumbnail_pool after the
+upload commits, with Pillow (in requirements.txt; where it is missing,
+recipes keep an empty thumbnail). Files no recipe points at any more are
+left in place.
+"""
+import contextlib
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.db import connections, transaction
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+from core.models import Recipe
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# enough for the PNG, GIF and WebP headers; JPEG sizes are looked for in
+# everything up to HEAD_MAX_BYTES, and images without one are refused
+SNIFF_BYTES = 32
+HEAD_MAX_BYTES = 64 * 2 ** 10
+# room for the multipart boundaries and headers around the image
+MULTIPART_OVERHEAD = 16 * 2 ** 10
+
+# thumbnail extension and Pillow format per image extension
+THUMBNAIL_FORMATS = {
+    'jpg': ('jpg', 'JPEG'),
+    'png': ('png', 'PNG'),
+    'gif': ('png', 'PNG'),
+    'webp': ('webp', 'WEBP'),
+}
+
+
+def _jpeg_size(head):
+    pos = 2
+    while pos + 9 <= len(head):
+        if head[pos] != 0xFF:
+            break
+        marker = head[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+        elif 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', head[pos + 5:pos + 9])
+            return width, height
+        elif 0xD0 <= marker <= 0xD9 or marker == 0x01:
+            pos += 2
+        else:
+            pos += 2 + struct.unpack('>H', head[pos + 2:pos + 4])[0]
+    return None, None
+
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a' and len(head) >= 30:
+        width, height = struct.unpack('<HH', head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and head[20:21] == b'\x2f':
+        bits = int.from_bytes(head[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return (int.from_bytes(head[24:27], 'little') + 1,
+                int.from_bytes(head[27:30], 'little') + 1)
+    return None, None
+
+
+def sniff(head):
+    """(extension, width, height) from the first bytes of an image.
+
+    extension is None if it isn't a format we take.
+    """
+    png = head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR'
+    if png and len(head) >= 24:
+        return ('png',) + struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        return ('gif',) + struct.unpack('<HH', head[6:10])
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return ('webp',) + _webp_size(head)
+    if head[:3] == b'\xff\xd8\xff':
+        return ('jpg',) + _jpeg_size(head)
+    return None, None, None
+
+
+def _remove(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def _file_mode():
+    return settings.FILE_UPLOAD_PERMISSIONS or 0o644
+
+
+class ImageUpload(UploadedFile):
+    """A streamed image on disk.
+
+    Its digest and format were worked out on the way in.
+    """
+
+    def __init__(self, file, name, content_type, size, digest, extension):
+        super().__init__(file, name, content_type, size)
+        self.digest = digest
+        self.extension = extension
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        finally:
+            # gone already once store() moved it into place
+            _remove(self.file.name)
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """The only upload handler of the image action.
+
+    error says why an image was refused.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = settings.RECIPE_IMAGE_MAX_BYTES
+        self.max_pixels = settings.RECIPE_IMAGE_MAX_PIXELS
+        self.error = None
+        self.started = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > self.max_bytes + MULTIPART_OVERHEAD:
+            # refuse before reading any of the body
+            self.error = f'Images can be at most {self.max_bytes} bytes.'
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.started:
+            # one temp file per request; later file parts are not read
+            if self.error is None:
+                self.error = 'Upload one image per request.'
+            raise SkipFile(self.error)
+        self.started = True
+        upload_dir = default_storage.path('tmp')
+        os.makedirs(upload_dir, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(
+            dir=upload_dir, suffix='.upload', delete=False)
+        self.hash = hashlib.sha256()
+        self.head = b''
+        self.extension = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            self.refuse(f'Images can be at most {self.max_bytes} bytes.')
+        if self.extension is None and len(self.head) < HEAD_MAX_BYTES:
+            self.head += raw_data[:HEAD_MAX_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self.check(final=len(self.head) >= HEAD_MAX_BYTES)
+        self.file.write(raw_data)
+        self.hash.update(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.extension is None:
+            try:
+                self.check(final=True)
+            except SkipFile:
+                return None
+        self.file.flush()
+        self.file.seek(0)
+        upload = ImageUpload(
+            self.file, self.file_name, self.content_type, file_size,
+            self.hash.hexdigest(), self.extension,
+        )
+        # the upload owns the file now, the parser closing this handler's
+        # files (on a skipped later part) must not close it
+        del self.file
+        return upload
+
+    def upload_interrupted(self):
+        self.discard()
+
+    def check(self, final):
+        """Validate the head read so far; final: no more of it is coming."""
+        extension, width, height = sniff(self.head)
+        if extension is None:
+            self.refuse('Upload a JPEG, PNG, GIF or WebP image.')
+        if width is None:
+            if not final:
+                return
+            # no way to hold it to max_pixels, or to know it is an image
+            self.refuse('Could not read the image size.')
+        if not 0 < width * height <= self.max_pixels:
+            self.refuse(f'Images can be at most {self.max_pixels} pixels.')
+        self.extension = extension
+
+    def refuse(self, error):
+        self.error = error
+        self.discard()
+        raise SkipFile(error)
+
+    def discard(self):
+        if getattr(self, 'file', None) is not None:
+            self.file.close()
+            _remove(self.file.name)
+
+
+def image_name(digest, extension):
+    return f'recipes/{digest[:2]}/{digest}.{extension}'
+
+
+def thumbnail_name(name):
+    """recipes/ab/<digest>.gif -> recipes/thumbs/<digest>-400x400.png"""
+    digest, extension = os.path.splitext(os.path.basename(name))
+    width, height = settings.THUMBNAIL_SIZE
+    thumb_extension = THUMBNAIL_FORMATS[extension[1:]][0]
+    return f'recipes/thumbs/{digest}-{width}x{height}.{thumb_extension}'
+
+
+def store(upload):
+    """Move an ImageUpload to its content-addressed name and return that.
+
+    Nothing is moved if the name exists already.
+    """
+    name = image_name(upload.digest, upload.extension)
+    path = default_storage.path(name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.chmod(upload.temporary_file_path(), _file_mode())
+        # same filesystem, so this is an atomic rename
+        os.replace(upload.temporary_file_path(), path)
+    return name
+
+
+def attach(recipe, upload):
+    """Give recipe the uploaded image.
+
+    And its thumbnail too, if another upload already made it.
+    """
+    recipe.image = store(upload)
+    thumbnail = thumbnail_name(recipe.image.name)
+    recipe.thumbnail = thumbnail if default_storage.exists(thumbnail) else ''
+    recipe.save(update_fields=['image', 'thumbnail'])
+    if not recipe.thumbnail and Image is not None:
+        name = recipe.image.name
+        transaction.on_commit(lambda: thumbnail_pool.submit(name))
+
+
+def make_thumbnail(name):
+    """Write the thumbnail of a stored image.
+
+    Every recipe showing the image is pointed at it.
+    """
+    thumbnail = thumbnail_name(name)
+    path = default_storage.path(thumbnail)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fmt = THUMBNAIL_FORMATS[name.rsplit('.', 1)[1]][1]
+        with tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(path), suffix='.tmp', delete=False) as out:
+            try:
+                with Image.open(default_storage.path(name)) as image:
+                    image.thumbnail(settings.THUMBNAIL_SIZE)
+                    image.save(out, fmt)
+            except BaseException:
+                _remove(out.name)
+                raise
+        os.chmod(out.name, _file_mode())
+        os.replace(out.name, path)
+    return Recipe.objects.filter(image=name).exclude(
+        thumbnail=thumbnail).update(thumbnail=thumbnail)
+
+
+class ThumbnailPool:
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix='thumbnail')
+            return self._executor
+
+    def submit(self, name):
+        return self.executor().submit(self._run, name)
+
+    def _run(self, name):
+        try:
+            make_thumbnail(name)
+        except Exception:
+            logger.exception('Could not make the thumbnail of %s', name)
+        finally:
+            # worker threads live outside the request cycle that closes
+            # connections
+            connections.close_all()
+
+
+thumbnail_pool = ThumbnailPool(getattr(settings, 'THUMBNAIL_WORKERS', 2))
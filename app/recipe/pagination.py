@@ -0,0 +1,64 @@
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination over the `-id` ordering the viewsets already use.
+
+    Only kicks in when the client asks for it with `?page_size=` or `?cursor=`,
+    so unpaginated clients keep getting a plain list.
+    """
+    ordering = '-id'
+    page_size = getattr(settings, 'RECIPE_PAGE_SIZE', 50)
+    max_page_size = getattr(settings, 'RECIPE_MAX_PAGE_SIZE', 500)
+    page_size_query_param = 'page_size'
+
+    def asked_for(self, request):
+        params = request.query_params
+        return (self.cursor_query_param in params
+                or self.page_size_query_param in params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.asked_for(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class SearchPagination(KeysetPagination):
+    """Pages of ranked search results, positioned on (rank, id).
+
+    paginate_queryset takes search(limit, after) instead of a queryset (see
+    recipe.search.search_recipes). Pages only go forward, so there is no
+    previous link.
+    """
+
+    def paginate_queryset(self, search, request, view=None):
+        if not self.asked_for(request):
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        after = None
+        if cursor is not None and cursor.position is not None:
+            try:
+                pk, rank = cursor.position.split(':')
+                after = (float(rank), int(pk))
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+        results = search(self.page_size + 1, after)
+        self.page = results[:self.page_size]
+        self.has_next = len(results) > self.page_size
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        position = f'{last.pk}:{last.rank!r}'
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        return None
@@ -0,0 +1,131 @@
+"""
+Full-text search over recipe titles and descriptions.
+
+On Postgres this uses the weighted `search_vector` column (title weight A,
+description weight B) and its GIN index. Other backends, e.g. sqlite in
+tests, fall back to an in-memory inverted index per user that is cached
+under the user's list-cache version, so it is rebuilt only after a write.
+"""
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank,
+)
+from django.db import connections
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast, Concat
+
+from core.models import Recipe
+from recipe.caching import get_cache, get_version
+
+SEARCH_CONFIG = 'english'
+START_SEL, STOP_SEL = '<b>', '</b>'
+TITLE_WEIGHT, DESCRIPTION_WEIGHT = 1.0, 0.4
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [word.lower() for word in WORD_RE.findall(text or '')]
+
+
+def highlight(text, terms):
+    """Wrap every word of text found in terms in START_SEL/STOP_SEL."""
+    def mark(match):
+        word = match.group(0)
+        if word.lower() not in terms:
+            return word
+        return f'{START_SEL}{word}{STOP_SEL}'
+    return WORD_RE.sub(mark, text)
+
+
+class InvertedIndex:
+    """token -> {recipe id: weighted term frequency} for one user's recipes."""
+
+    def __init__(self, rows):
+        self.postings = defaultdict(lambda: defaultdict(float))
+        for pk, title, description in rows:
+            for word in tokenize(title):
+                self.postings[word][pk] += TITLE_WEIGHT
+            for word in tokenize(description):
+                self.postings[word][pk] += DESCRIPTION_WEIGHT
+        self.postings = {
+            word: dict(ids) for word, ids in self.postings.items()}
+
+    def search(self, terms):
+        """Return [(id, rank)] of recipes containing every term, best first."""
+        if not terms:
+            return []
+        postings = sorted(
+            (self.postings.get(term, {}) for term in terms), key=len)
+        hits = set(postings[0]).intersection(*postings[1:])
+        ranked = ((pk, sum(p[pk] for p in postings)) for pk in hits)
+        return sorted(ranked, key=lambda item: (-item[1], -item[0]))
+
+
+def get_index(user_id):
+    """The inverted index over all of user's recipes."""
+    cache = get_cache()
+    if cache is None:
+        return _build_index(user_id)
+    key = f'recipe-search-index:{user_id}:{get_version(user_id)}'
+    index = cache.get(key)
+    if index is None:
+        index = _build_index(user_id)
+        cache.set(key, index, getattr(settings, 'RECIPE_CACHE_TTL', 300))
+    return index
+
+
+def _build_index(user_id):
+    rows = Recipe.objects.filter(user_id=user_id).values_list(
+        'id', 'title', 'description')
+    return InvertedIndex(rows.iterator())
+
+
+def search_recipes(queryset, user_id, q, limit=None, after=None):
+    """Return up to limit recipes from queryset matching q, best first.
+
+    after is the (rank, id) of the last recipe of the previous page; only
+    recipes ranked below it are returned. Each recipe gets `rank` and
+    `headline` (title and description with the matches wrapped in <b></b>)
+    attributes.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        return _search_postgres(queryset, q, limit, after)
+
+    terms = set(tokenize(q))
+    hits = get_index(user_id).search(terms)
+    if after is not None:
+        hits = [(pk, rank) for pk, rank in hits if (rank, pk) < after]
+    # the index covers every recipe of the user, in_bulk drops the ones
+    # queryset filters out
+    recipes = queryset.in_bulk([pk for pk, rank in hits])
+    results = []
+    for pk, rank in hits:
+        recipe = recipes.get(pk)
+        if recipe is None:
+            continue
+        if len(results) == limit:
+            break
+        recipe.rank = rank
+        text = f'{recipe.title} {recipe.description}'.strip()
+        recipe.headline = highlight(text, terms)
+        results.append(recipe)
+    return results
+
+
+def _search_postgres(queryset, q, limit, after):
+    query = SearchQuery(q, config=SEARCH_CONFIG, search_type='websearch')
+    queryset = queryset.filter(search_vector=query).annotate(
+        # ts_rank gives a real; as a double it round-trips through cursors
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+        headline=SearchHeadline(
+            Concat('title', Value(' '), 'description'), query,
+            config=SEARCH_CONFIG, start_sel=START_SEL, stop_sel=STOP_SEL,
+        ),
+    )
+    if after is not None:
+        rank, pk = after
+        queryset = queryset.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=pk))
+    return list(queryset.order_by('-rank', '-id')[:limit])
@@ -1,53 +1,177 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
+from core.instrumentation import TimedSerializerMixin
 from core.models import Recipe, Tag, Ingredient
 
-class TagSerializer(serializers.ModelSerializer):
+
+def get_or_create_many(model, user, names):
+    """One `model` object per name for user, the missing ones bulk created."""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return []
+    existing = model.objects.filter(user=user, name__in=names)
+    found = {obj.name: obj for obj in existing}
+    missing = [model(user=user, name=name)
+               for name in names if name not in found]
+    if missing:
+        created = model.objects.bulk_create(missing)
+        if any(obj.pk is None for obj in created):
+            # backends that can't return ids from a bulk insert (sqlite)
+            created = model.objects.filter(
+                user=user, name__in=[obj.name for obj in missing])
+        found.update((obj.name, obj) for obj in created)
+    return [found[name] for name in names]
+
+
+def lock_user(user):
+    """Hold back a user's other tag/ingredient writes until this commits."""
+    get_user_model().objects.select_for_update().filter(pk=user.pk).exists()
+
+
+class UniqueNameMixin:
+    """400 instead of an IntegrityError for a name the user already has.
+
+    DRF 3.12 doesn't validate UniqueConstraint, only unique_together.
+    """
+
+    def validate_name(self, value):
+        if self.parent is not None:
+            # nested in a recipe, where get_or_create_many reuses names
+            return value
+        user = self.context['request'].user
+        others = self.Meta.model.objects.filter(user=user, name=value)
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        if others.exists():
+            raise serializers.ValidationError(
+                f'You already have a {self.Meta.model._meta.verbose_name} '
+                f'named {value!r}.'
+            )
+        return value
+
+
+class TagSerializer(UniqueNameMixin, TimedSerializerMixin,
+                    serializers.ModelSerializer):
     class Meta:
         model = Tag
-        fields = ['id', 'name']
-        read_only_fields = ['id']
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ['id', 'recipe_count']
 
-class IngredientSerializer(serializers.ModelSerializer):
+
+class IngredientSerializer(UniqueNameMixin, TimedSerializerMixin,
+                           serializers.ModelSerializer):
     class Meta:
         model = Ingredient
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ['id', 'recipe_count']
+
+
+# nested in recipes, where the counts would only be noise
+class RecipeTagSerializer(TagSerializer):
+    class Meta(TagSerializer.Meta):
         fields = ['id', 'name']
         read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    tags = TagSerializer(many=True, required=False)
-    ingredients = IngredientSerializer(many=True, required=False)
+class RecipeIngredientSerializer(IngredientSerializer):
+    class Meta(IngredientSerializer.Meta):
+        fields = ['id', 'name']
+        read_only_fields = ['id']
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    tags = RecipeTagSerializer(many=True, required=False)
+    ingredients = RecipeIngredientSerializer(many=True, required=False)
     class Meta:
         model = Recipe
         fields = ['id', 'title', 'time_minutes', 'price', 'tags', 'ingredients']
         read_only_fields = ['id']
 
 
+class RecipeSearchSerializer(RecipeSerializer):
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['rank', 'headline']
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'thumbnail']
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe."""
         tags = validated_data.pop('tags', [])
         ings = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
-
-        for tag in ings:
-            tag_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.ingredients.add(tag_obj)
+        if tags or ings:
+            lock_user(auth_user)
+        if tags:
+            recipe.tags.add(*get_or_create_many(
+                Tag, auth_user, [tag['name'] for tag in tags]))
+        if ings:
+            recipe.ingredients.add(*get_or_create_many(
+                Ingredient, auth_user, [ing['name'] for ing in ings]))
 
         return recipe
 
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """Update a recipe, touching only the tag/ingredient rows to change."""
+        tags = validated_data.pop('tags', None)
+        ings = validated_data.pop('ingredients', None)
+        auth_user = self.context['request'].user
+        if tags or ings:
+            lock_user(auth_user)
+        if tags is not None:
+            self._sync(instance.tags, Tag, auth_user, tags)
+        if ings is not None:
+            self._sync(instance.ingredients, Ingredient, auth_user, ings)
+
+        return super().update(instance, validated_data)
+
+    def _sync(self, manager, model, user, items):
+        """Make manager hold exactly the objects named in items."""
+        names = [item['name'] for item in items]
+        wanted = {obj.pk for obj in get_or_create_many(model, user, names)}
+        current = set(manager.values_list('id', flat=True))
+        if current - wanted:
+            manager.remove(*(current - wanted))
+        if wanted - current:
+            manager.add(*(wanted - current))
+
+
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """Response of the image upload.
+
+    The image itself arrives as a multipart file.
+    """
+    class Meta:
+        model = Recipe
+        fields = ['id', 'image', 'thumbnail']
+        read_only_fields = ['id', 'image', 'thumbnail']
+
 
+class RecipeBulkSerializer(serializers.Serializer):
+    """Envelope of a bulk request, the items are validated by recipe.bulk."""
+    create = serializers.ListField(
+        child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(
+        child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list)
+    atomic = serializers.BooleanField(required=False, default=True)
 
+    def validate(self, attrs):
+        size = sum(len(attrs[key]) for key in ('create', 'update', 'delete'))
+        limit = getattr(settings, 'RECIPE_BULK_MAX_ITEMS', 500)
+        if size > limit:
+            raise serializers.ValidationError(
+                f'At most {limit} items per request.')
+        return attrs
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from django.test import TransactionTestCase, AsyncClient, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from decimal import Decimal
+from unittest.mock import patch
+from rest_framework.authtoken.models import Token
+from rest_framework import status
+from core.authentication import local_tokens
+from core.models import Recipe, Tag
+
+
+ASYNC_RECIPES_URL = reverse('recipe-async:recipe-list')
+ASYNC_TAGS_URL = reverse('recipe-async:tag-list')
+ASYNC_TOKEN_URL = reverse('user-async:token')
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# the views run on pool threads, which only see committed data
+class AsyncViewsTest(TransactionTestCase):
+    def setUp(self):
+        local_tokens.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.token = Token.objects.create(user=self.user)
+        # AsyncClient takes ASGI header names
+        self.auth = {'authorization': f'Token {self.token.key}'}
+        self.client = AsyncClient()
+
+    def test_auth_required_without_thread(self):
+        with patch('core.async_views.close_old_connections') as patched:
+            res = run(self.client.get(ASYNC_RECIPES_URL))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        patched.assert_not_called()
+
+    @override_settings(RECIPE_CACHE_ALIAS='default')
+    def test_list_and_detail(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('2.50'))
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Quick'))
+
+        res = run(self.client.get(ASYNC_RECIPES_URL, **self.auth))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tags = json.loads(res.content)[0]['tags']
+        self.assertEqual(tags, [{'id': recipe.tags.get().id, 'name': 'Quick'}])
+        self.assertIn('ETag', res)
+
+        url = reverse('recipe-async:recipe-detail', args=[recipe.id])
+        res = run(self.client.get(url, **self.auth))
+        self.assertEqual(json.loads(res.content)['price'], '2.50')
+
+    def test_concurrent_requests(self):
+        Tag.objects.create(user=self.user, name='Quick')
+
+        async def many():
+            return await asyncio.gather(*[
+                self.client.get(ASYNC_TAGS_URL, **self.auth)
+                for _ in range(5)
+            ])
+
+        codes = {res.status_code for res in run(many())}
+        self.assertEqual(codes, {status.HTTP_200_OK})
+
+    def test_token(self):
+        payload = {'email': 'test@gmail.com', 'password': '123456'}
+        res = run(self.client.post(
+            ASYNC_TOKEN_URL, payload, content_type='application/json'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content)['token'], self.token.key)
+
+    def test_token_bad_credentials(self):
+        payload = {'email': 'test@gmail.com', 'password': 'wrong'}
+        res = run(self.client.post(
+            ASYNC_TOKEN_URL, payload, content_type='application/json'))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
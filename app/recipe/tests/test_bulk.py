@@ -0,0 +1,127 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from decimal import Decimal
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Recipe, Tag, Ingredient
+
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Sample', 'time_minutes': 5, 'price': Decimal('1.50')}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def recipe_payload(n, tags=(), ingredients=()):
+    return {
+        'title': f'Recipe {n}',
+        'time_minutes': 10,
+        'price': '2.50',
+        'tags': [{'name': name} for name in tags],
+        'ingredients': [{'name': name} for name in ingredients],
+    }
+
+
+class BulkRecipeTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_create(self):
+        Tag.objects.create(user=self.user, name='Dinner')
+        payload = {'create': [
+            recipe_payload(1, tags=['Dinner', 'Thai'], ingredients=['Rice']),
+            recipe_payload(2, tags=['Thai'], ingredients=['Rice', 'Prawn']),
+        ]}
+        res = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in res.data['create']], [201, 201])
+        first = Recipe.objects.get(id=res.data['create'][0]['id'])
+        self.assertEqual(set(first.tags.values_list('name', flat=True)),
+                         {'Dinner', 'Thai'})
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_queries_do_not_grow_with_names(self):
+        counts = []
+        for n in (2, 20):
+            payload = {'create': [
+                recipe_payload(0, tags=[f't{n}-{i}' for i in range(n)],
+                               ingredients=[f'i{n}-{i}' for i in range(n)]),
+            ]}
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(BULK_URL, payload, format='json')
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_update_and_delete(self):
+        keep = create_recipe(self.user)
+        keep.tags.add(Tag.objects.create(user=self.user, name='Old'))
+        gone = create_recipe(self.user)
+        payload = {
+            'update': [{'id': keep.id, 'title': 'Renamed',
+                        'tags': [{'name': 'New'}]}],
+            'delete': [gone.id],
+        }
+        res = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        keep.refresh_from_db()
+        self.assertEqual(keep.title, 'Renamed')
+        self.assertEqual(
+            list(keep.tags.values_list('name', flat=True)), ['New'])
+        self.assertFalse(Recipe.objects.filter(id=gone.id).exists())
+
+    def test_bool_id_not_taken_for_a_number(self):
+        recipe = create_recipe(self.user, id=1)
+        payload = {'update': [{'id': True, 'title': 'Renamed'}],
+                   'atomic': False}
+        res = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(res.data['update'][0]['status'], 404)
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.title, 'Renamed')
+
+    def test_atomic_failure_writes_nothing(self):
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com', password='123456')
+        foreign = create_recipe(other)
+        payload = {
+            'create': [recipe_payload(1), {'title': 'no price'}],
+            'delete': [foreign.id],
+        }
+        res = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([r['status'] for r in res.data['create']], [424, 400])
+        self.assertIn('price', res.data['create'][1]['errors'])
+        self.assertEqual(res.data['delete'][0]['status'], 404)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+        self.assertTrue(Recipe.objects.filter(id=foreign.id).exists())
+
+    def test_partial_failure(self):
+        payload = {
+            'create': [recipe_payload(1), {'title': 'no price'}],
+            'atomic': False,
+        }
+        res = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([r['status'] for r in res.data['create']], [201, 400])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_invalidates_list_cache(self):
+        list_url = reverse('recipe:recipe-list')
+        self.client.get(list_url)
+        self.client.post(
+            BULK_URL, {'create': [recipe_payload(1)]}, format='json')
+        self.assertEqual(len(self.client.get(list_url).data), 1)
+
+    def test_too_many_items(self):
+        with self.settings(RECIPE_BULK_MAX_ITEMS=1):
+            res = self.client.post(BULK_URL, {'delete': [1, 2]}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,86 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from decimal import Decimal
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Sample', 'time_minutes': 5, 'price': Decimal('1.50')}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RECIPE_CACHE_ALIAS='default')
+class ListCacheTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_repeat_list_served_from_cache(self):
+        create_recipe(self.user)
+        first = self.client.get(RECIPES_URL)
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPES_URL)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        res = self.client.get(TAGS_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get(RECIPES_URL)['ETag']
+        create_recipe(self.user)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_m2m_change_invalidates(self):
+        recipe = create_recipe(self.user)
+        self.client.get(RECIPES_URL)
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='salt'))
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data[0]['ingredients'][0]['name'], 'salt')
+
+    def test_tag_delete_invalidates(self):
+        tag = Tag.objects.create(user=self.user, name='a')
+        self.assertEqual(len(self.client.get(TAGS_URL).data), 1)
+        tag.delete()
+        self.assertEqual(len(self.client.get(TAGS_URL).data), 0)
+
+    def test_other_user_write_keeps_cache(self):
+        etag = self.client.get(INGREDIENTS_URL)['ETag']
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com', password='123456')
+        Ingredient.objects.create(user=other, name='salt')
+        res = self.client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class NoSharedCacheTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @override_settings(RECIPE_CACHE_ALIAS=None)
+    def test_lists_not_cached(self):
+        res = self.client.get(RECIPES_URL)
+        self.assertNotIn('ETag', res)
+        create_recipe(self.user)
+        self.assertEqual(len(self.client.get(RECIPES_URL).data), 1)
@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from decimal import Decimal
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.export import iter_recipes
+from recipe.serializers import RecipeDetailSerializer
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_recipe(user, n):
+    recipe = Recipe.objects.create(
+        user=user, title=f'Recipe {n}', time_minutes=n, price=Decimal('3.5'),
+        description=f'Step {n}',
+    )
+    recipe.tags.add(Tag.objects.create(user=user, name=f'tag {n}'))
+    recipe.ingredients.add(*[
+        Ingredient.objects.create(user=user, name=f'ing {n} {i}')
+        for i in range(2)
+    ])
+    return recipe
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_export_ndjson_matches_serializer(self):
+        for n in range(3):
+            create_recipe(self.user, n)
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        expected = RecipeDetailSerializer(
+            Recipe.objects.order_by('-id'), many=True).data
+        self.assertEqual([json.loads(line) for line in lines],
+                         json.loads(json.dumps(expected)))
+
+    def test_export_csv(self):
+        create_recipe(self.user, 1)
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+        body = b''.join(res.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][-2:], ['tags', 'ingredients'])
+        self.assertEqual(rows[1][1], 'Recipe 1')
+        self.assertEqual(rows[1][3], '3.50')
+        self.assertEqual(rows[1][-1], 'ing 1 0|ing 1 1')
+
+    def test_export_bad_type(self):
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_only_own_recipes(self):
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com', password='123456')
+        create_recipe(other, 1)
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(b''.join(res.streaming_content), b'')
+
+    def test_queries_per_chunk(self):
+        for n in range(5):
+            create_recipe(self.user, n)
+        # one query for the rows, then tags and ingredients for each of the
+        # 3 chunks
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        with self.assertNumQueries(1 + 3 * 2):
+            rows = list(iter_recipes(recipes, chunk_size=2))
+        self.assertEqual(len(rows), 5)
+
+    def test_export_json_array(self):
+        for n in range(3):
+            create_recipe(self.user, n)
+        res = self.client.get(EXPORT_URL, {'type': 'json'})
+        self.assertEqual(res['Content-Type'], 'application/json')
+        expected = RecipeDetailSerializer(
+            Recipe.objects.order_by('-id'), many=True).data
+        body = b''.join(res.streaming_content)
+        self.assertEqual(json.loads(body), json.loads(json.dumps(expected)))
@@ -0,0 +1,84 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.urls import reverse
+from decimal import Decimal
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.fastpath import recipe_dicts
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def ordered(queryset):
+    return queryset.order_by('-id').prefetch_related(
+        Prefetch('tags', queryset=Tag.objects.order_by('id')),
+        Prefetch('ingredients',
+                 queryset=Ingredient.objects.order_by('id')),
+    )
+
+
+class FastPathParityTest(TestCase):
+    """recipe_dicts must render exactly like the DRF serializers."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ['Zesty', 'Äpfel', 'Quick "fast"']]
+        ings = [Ingredient.objects.create(user=self.user, name=name)
+                for name in ['Salt', 'Pepper']]
+        prices = [Decimal('5.5'), Decimal('0.00'), Decimal('99.99'),
+                  Decimal('10')]
+        for n, price in enumerate(prices):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {n} <b>', time_minutes=n,
+                price=price,
+                description='' if n % 2 else 'Line one\nline "two"',
+            )
+            recipe.tags.add(*tags[n % 3:])
+            if n:
+                recipe.ingredients.add(*reversed(ings))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def assertSameJson(self, queryset, serializer_class):
+        queryset = queryset.order_by('-id')
+        expected = JSONRenderer().render(
+            serializer_class(ordered(queryset), many=True).data)
+        actual = JSONRenderer().render(
+            list(recipe_dicts(queryset, serializer_class)))
+        self.assertEqual(actual, expected)
+
+    def test_list_parity(self):
+        self.assertSameJson(
+            Recipe.objects.filter(user=self.user), RecipeSerializer)
+
+    def test_detail_parity(self):
+        self.assertSameJson(
+            Recipe.objects.filter(user=self.user), RecipeDetailSerializer)
+
+    def test_parity_across_chunks(self):
+        queryset = Recipe.objects.filter(user=self.user).order_by('-id')
+        whole = list(recipe_dicts(queryset, RecipeSerializer))
+        chunked = recipe_dicts(queryset, RecipeSerializer, chunk_size=1)
+        self.assertEqual(list(chunked), whole)
+
+    def test_api_response_parity(self):
+        res = self.client.get(RECIPES_URL)
+        expected = JSONRenderer().render(
+            RecipeSerializer(ordered(Recipe.objects.all()), many=True).data)
+        self.assertEqual(res.content, expected)
+
+    def test_slow_path_same_response(self):
+        zesty = str(Tag.objects.get(name='Zesty').id)
+        fast = self.client.get(RECIPES_URL, {'tags': zesty}).content
+        with self.settings(RECIPE_FAST_LIST=False):
+            # different query string so the list cache doesn't answer
+            slow = self.client.get(
+                RECIPES_URL, {'tags': zesty, 'x': 1}).content
+        self.assertEqual(fast, slow)
@@ -0,0 +1,264 @@
+import hashlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import images
+
+
+def png(width=4, height=3, body=b'\0' * 64):
+    ihdr = struct.pack('>I4sII', 13, b'IHDR', width, height)
+    return b'\x89PNG\r\n\x1a\n' + ihdr + b'\x08\x06\0\0\0' + body
+
+
+def jpeg(width=640, height=480):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\0' + b'\0' * 9
+    sof = b'\xff\xc0' + struct.pack('>HBHH', 17, 8, height, width) + b'\0' * 10
+    return b'\xff\xd8' + app0 + sof + b'\0' * 64
+
+
+def upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+class SniffTests(SimpleTestCase):
+    def test_formats(self):
+        self.assertEqual(images.sniff(png(4, 3)), ('png', 4, 3))
+        gif = b'GIF89a' + struct.pack('<HH', 10, 20) + b'\0' * 32
+        self.assertEqual(images.sniff(gif), ('gif', 10, 20))
+        self.assertEqual(images.sniff(jpeg(640, 480)), ('jpg', 640, 480))
+        vp8x = (b'RIFF\0\0\0\0WEBPVP8X' + b'\0' * 8
+                + (99).to_bytes(3, 'little') + (49).to_bytes(3, 'little'))
+        self.assertEqual(images.sniff(vp8x), ('webp', 100, 50))
+
+    def test_size_not_found(self):
+        self.assertEqual(images.sniff(jpeg()[:24]), ('jpg', None, None))
+        webp = b'RIFF\0\0\0\0WEBPJUNK' + b'\0' * 32
+        self.assertEqual(images.sniff(webp), ('webp', None, None))
+
+    def test_not_an_image(self):
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"/>'
+        self.assertEqual(images.sniff(svg), (None, None, None))
+
+    def test_thumbnail_name(self):
+        with override_settings(THUMBNAIL_SIZE=(200, 100)):
+            self.assertEqual(images.thumbnail_name('recipes/ab/abcd.gif'),
+                             'recipes/thumbs/abcd-200x100.png')
+
+
+class ImageUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.recipe = self.make_recipe(self.user)
+
+    def make_recipe(self, user):
+        return Recipe.objects.create(user=user, title='Soup', time_minutes=5,
+                                     price=Decimal('2.50'))
+
+    def upload(self, data, recipe=None, name='photo.png'):
+        recipe = recipe or self.recipe
+        return self.client.post(upload_url(recipe.id),
+                                {'image': SimpleUploadedFile(name, data)},
+                                format='multipart')
+
+    def leftovers(self):
+        tmp = os.path.join(self.media, 'tmp')
+        return os.listdir(tmp) if os.path.isdir(tmp) else []
+
+    def test_upload(self):
+        data = png()
+        res = self.upload(data)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        digest = hashlib.sha256(data).hexdigest()
+        name = f'recipes/{digest[:2]}/{digest}.png'
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, name)
+        self.assertTrue(res.data['image'].endswith(name))
+        self.assertIsNone(res.data['thumbnail'])
+        with open(os.path.join(self.media, name), 'rb') as stored:
+            self.assertEqual(stored.read(), data)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_identical_images_stored_once(self):
+        other = self.make_recipe(self.user)
+        first = self.upload(png())
+        second = self.upload(png(), recipe=other, name='copy.png')
+
+        self.assertEqual(first.data['image'], second.data['image'])
+        stored = os.listdir(os.path.join(self.media, 'recipes'))
+        self.assertEqual(len(stored), 1)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_detail_shows_image(self):
+        self.upload(png())
+        res = self.client.get(
+            reverse('recipe:recipe-detail', args=[self.recipe.id]))
+        self.assertIn('/media/recipes/', res.data['image'])
+
+    def test_not_an_image(self):
+        res = self.upload(b'GIF-ish but not really' * 4, name='photo.gif')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('JPEG, PNG', res.data['image'])
+        self.assertEqual(self.leftovers(), [])
+
+    def test_magic_bytes_without_an_image(self):
+        for data in (b'\xff\xd8\xff<html><script>alert(1)</script>'
+                     + b' ' * 64,
+                     b'RIFF\0\0\0\0WEBPJUNK' + b'<html>' * 20):
+            res = self.upload(data, name='photo.jpg')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('image size', res.data['image'])
+        self.assertFalse(os.path.isdir(os.path.join(self.media, 'recipes')))
+        self.assertEqual(self.leftovers(), [])
+
+    def test_too_short(self):
+        res = self.upload(b'\x89PNG')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_too_many_bytes(self):
+        with override_settings(RECIPE_IMAGE_MAX_BYTES=1000):
+            res = self.upload(png(body=b'\0' * 5000))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bytes', res.data['image'])
+        self.assertEqual(self.leftovers(), [])
+
+    def test_too_large_body_not_read(self):
+        with override_settings(RECIPE_IMAGE_MAX_BYTES=1000):
+            res = self.upload(png(body=b'\0' * 50000))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(os.path.isdir(os.path.join(self.media, 'tmp')))
+
+    def test_too_many_pixels(self):
+        with override_settings(RECIPE_IMAGE_MAX_PIXELS=1000):
+            res = self.upload(png(100, 100))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', res.data['image'])
+
+    def test_no_file(self):
+        res = self.client.post(upload_url(self.recipe.id), {'title': 'x'},
+                               format='multipart')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_one_file_per_request(self):
+        res = self.client.post(upload_url(self.recipe.id), {
+            'image': SimpleUploadedFile('a.png', png()),
+            'extra': SimpleUploadedFile('b.png', png(8, 8)),
+        }, format='multipart')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.leftovers(), [])
+
+        res = self.client.post(upload_url(self.recipe.id), {
+            'extra': SimpleUploadedFile('a.png', png()),
+            'image': SimpleUploadedFile('b.png', png(8, 8)),
+        }, format='multipart')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('one image', res.data['image'])
+        self.assertEqual(self.leftovers(), [])
+
+    def test_other_users_recipe(self):
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com', password='123456')
+        res = self.upload(png(), recipe=self.make_recipe(other))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_thumbnail_scheduled_after_commit(self):
+        with patch('recipe.images.Image', MagicMock()), \
+                patch.object(images.thumbnail_pool, 'submit') as submit, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.upload(png())
+        self.recipe.refresh_from_db()
+        submit.assert_called_once_with(self.recipe.image.name)
+
+    def test_existing_thumbnail_reused(self):
+        self.upload(png())
+        self.recipe.refresh_from_db()
+        expected = images.thumbnail_name(self.recipe.image.name)
+        thumbnail = os.path.join(self.media, expected)
+        os.makedirs(os.path.dirname(thumbnail))
+        open(thumbnail, 'wb').close()
+
+        with patch.object(images.thumbnail_pool, 'submit') as submit:
+            res = self.upload(png(), recipe=self.make_recipe(self.user))
+        self.assertTrue(res.data['thumbnail'].endswith(expected))
+        submit.assert_not_called()
+
+    def test_make_thumbnail(self):
+        self.upload(png())
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+        fake = MagicMock()
+        image = fake.open.return_value.__enter__.return_value
+        image.save.side_effect = lambda out, fmt: out.write(b'thumb')
+
+        with patch('recipe.images.Image', fake):
+            self.assertEqual(images.make_thumbnail(name), 1)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.thumbnail.name,
+                         images.thumbnail_name(name))
+        path = os.path.join(self.media, self.recipe.thumbnail.name)
+        with open(path, 'rb') as stored:
+            self.assertEqual(stored.read(), b'thumb')
+
+    @skipIf(images.Image is None, 'Pillow is not installed')
+    @override_settings(THUMBNAIL_SIZE=(100, 100))
+    def test_make_real_thumbnail(self):
+        photo = io.BytesIO()
+        images.Image.new('RGB', (800, 600), 'orange').save(photo, 'JPEG')
+        res = self.upload(photo.getvalue(), name='photo.jpg')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+
+        images.make_thumbnail(self.recipe.image.name)
+
+        self.recipe.refresh_from_db()
+        path = os.path.join(self.media, self.recipe.thumbnail.name)
+        with images.Image.open(path) as thumbnail:
+            self.assertEqual(thumbnail.format, 'JPEG')
+            self.assertEqual(thumbnail.size, (100, 75))
+
+    def test_served_with_long_cache(self):
+        self.upload(png())
+        self.recipe.refresh_from_db()
+        res = self.client.get(
+            reverse('media', kwargs={'path': self.recipe.image.name}))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('immutable', res['Cache-Control'])
+        res = self.client.get(
+            reverse('media', kwargs={'path': 'tmp/x.upload'}))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_no_traversal_out_of_recipes(self):
+        os.makedirs(os.path.join(self.media, 'tmp'))
+        with open(os.path.join(self.media, 'tmp', 'x.upload'), 'wb') as f:
+            f.write(b'secret')
+        for path in ('recipes/../tmp/x.upload', 'recipes/%2e%2e/tmp/x.upload',
+                     'recipes/./../tmp/x.upload'):
+            res = self.client.get(f'/media/{path}')
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
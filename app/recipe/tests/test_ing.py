@@ -5,6 +5,7 @@ from decimal import Decimal
 from rest_framework.test import APIClient
 from rest_framework import status
 from core.models import Recipe, Ingredient
+from core.testing import Budget, QueryBudgetMixin
 
 from recipe.serializers import IngredientSerializer
 
@@ -67,6 +68,18 @@ class PrivateIngredientTest(TestCase):
         ing.refresh_from_db()
         self.assertEqual(ing.name, payload['name'])
 
+    def test_rename_to_existing_name(self):
+        first = Ingredient.objects.create(user=self.user, name='1')
+        Ingredient.objects.create(user=self.user, name='2')
+        res = self.client.patch(detail_url(first.id), {'name': '2'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        # keeping its own name, or taking one only another user has, is fine
+        res = self.client.patch(detail_url(first.id), {'name': '1'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        Ingredient.objects.create(user=create_user(), name='3')
+        res = self.client.patch(detail_url(first.id), {'name': '3'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_delete(self):
         i = Ingredient.objects.create(user=self.user, name='1')
@@ -74,4 +87,56 @@ class PrivateIngredientTest(TestCase):
         res = self.client.delete(url)
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         all = Ingredient.objects.filter(user=self.user)
-        self.assertFalse(all.exists())
\ No newline at end of file
+        self.assertFalse(all.exists())
+
+    def test_filter_assigned_only(self):
+        i1 = Ingredient.objects.create(user=self.user, name='Apple')
+        Ingredient.objects.create(user=self.user, name='Pear')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=5, price=Decimal('1.00'))
+        recipe.ingredients.add(i1)
+        res = self.client.get(Ingredients_URL, {'assigned_only': 1})
+        i1.refresh_from_db()
+        self.assertEqual(res.data, IngredientSerializer([i1], many=True).data)
+
+
+class IngredientBudgetTest(QueryBudgetMixin, TestCase):
+    """Database cost of the ingredient endpoints.
+
+    A blown budget lists the SQL.
+    """
+    query_budgets = {
+        'ingredient-list': Budget(queries=1),
+        'ingredient-partial_update': Budget(queries=3),
+        'ingredient-destroy': Budget(queries=3),
+    }
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.objs = [
+            Ingredient.objects.create(user=self.user, name=f'ingredient {n}')
+            for n in range(10)
+        ]
+        recipe = Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=5,
+            price=Decimal('1.00'))
+        recipe.ingredients.add(*self.objs[:5])
+
+    def test_list(self):
+        res = self.request_within_budget('get', Ingredients_URL)
+        self.assertEqual(len(res.data), 10)
+
+    def test_assigned_only(self):
+        res = self.request_within_budget(
+            'get', Ingredients_URL, {'assigned_only': 1})
+        self.assertEqual(len(res.data), 5)
+
+    def test_partial_update(self):
+        self.request_within_budget(
+            'patch', detail_url(self.objs[0].id), {'name': 'New'})
+
+    def test_destroy(self):
+        self.request_within_budget('delete', detail_url(self.objs[0].id))
@@ -1,11 +1,16 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from decimal import Decimal
+from unittest.mock import patch
 from rest_framework.test import APIClient
 from rest_framework import status
 from core.models import Recipe, Tag, Ingredient
+from core.testing import Budget, QueryBudgetMixin
 
+from recipe.pagination import KeysetPagination
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
@@ -31,6 +36,36 @@ def create_recipe(user, **params):
     return recipe
 
 
+def create_full_recipe(user, n):
+    """Create a recipe with a couple of tags and ingredients attached."""
+    recipe = create_recipe(user, title=f'recipe {n}')
+    recipe.tags.add(
+        Tag.objects.create(user=user, name=f'tag {n}'),
+        Tag.objects.create(user=user, name=f'tag {n}b'),
+    )
+    recipe.ingredients.add(
+        Ingredient.objects.create(user=user, name=f'ing {n}'))
+    return recipe
+
+
+def assert_fixed_queries(test, url, user, sizes=(1, 5, 20)):
+    """Assert that GET url costs the same number of queries for every size."""
+    counts = []
+    created = 0
+    for size in sizes:
+        while created < size:
+            create_full_recipe(user, created)
+            created += 1
+        with CaptureQueriesContext(connection) as ctx:
+            res = test.client.get(url)
+        test.assertEqual(res.status_code, status.HTTP_200_OK)
+        counts.append(len(ctx.captured_queries))
+    test.assertEqual(
+        len(set(counts)), 1,
+        f'query count grows with rows: {dict(zip(sizes, counts))}')
+    return counts[0]
+
+
 class PublicRecipeTest(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -69,6 +104,16 @@ class PrivateRecipeTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, ser.data)
 
+    def test_list_recipes_fixed_queries(self):
+        """Listing recipes does not issue extra queries per recipe."""
+        self.assertEqual(assert_fixed_queries(self, RECIPES_URL, self.user), 3)
+
+    def test_get_recipe_detail_queries(self):
+        recipe = create_full_recipe(self.user, 0)
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertEqual(len(res.data['ingredients']), 1)
 
     def test_get_recipe_detail(self):
         recipe = create_recipe(user=self.user)
@@ -172,4 +217,186 @@ class PrivateRecipeTest(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_recipe_nested_queries_fixed(self):
+        """Creating a recipe costs the same queries for 2 or 20 names."""
+        counts = []
+        for n in (2, 20):
+            Tag.objects.create(user=self.user, name=f'existing {n}')
+            payload = {
+                'title': 'Soup',
+                'time_minutes': 10,
+                'price': Decimal('1.00'),
+                'tags': [{'name': f'existing {n}'}]
+                + [{'name': f'tag {n} {i}'} for i in range(n)],
+                'ingredients': [{'name': f'ing {n} {i}'} for i in range(n)],
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(res.data['tags']), n + 1)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        existing = Tag.objects.filter(user=self.user, name='existing 20')
+        self.assertEqual(existing.count(), 1)
+
+    def test_update_recipe_tags(self):
+        recipe = create_recipe(self.user)
+        keep = Tag.objects.create(user=self.user, name='Keep')
+        drop = Tag.objects.create(user=self.user, name='Drop')
+        recipe.tags.add(keep, drop)
+        payload = {'tags': [{'name': 'Keep'}, {'name': 'New'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = set(recipe.tags.values_list('name', flat=True))
+        self.assertEqual(names, {'Keep', 'New'})
+        self.assertTrue(Tag.objects.filter(id=drop.id).exists())
+
+    def test_update_recipe_ings_only_delta(self):
+        """Unchanged join rows are left in place."""
+        recipe = create_recipe(self.user)
+        ing = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.ingredients.add(ing)
+        through = Recipe.ingredients.through
+        row_id = through.objects.get(recipe=recipe, ingredient=ing).id
+        payload = {'ingredients': [{'name': 'Salt'}, {'name': 'Pepper'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(through.objects.filter(id=row_id).exists())
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_update_recipe_clear_tags(self):
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Old'))
+        res = self.client.patch(
+            detail_url(recipe.id), {'tags': []}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipe.tags.count(), 0)
+
+    def test_partial_update_keeps_tags(self):
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Old'))
+        res = self.client.patch(
+            detail_url(recipe.id), {'title': 'New title'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'New title')
+        self.assertEqual(recipe.tags.count(), 1)
+
+    def test_list_recipes_keyset_pages(self):
+        ids = [create_recipe(self.user).id for _ in range(5)]
+        seen = []
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            seen += [r['id'] for r in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+        self.assertEqual(seen, sorted(ids, reverse=True))
+
+    def test_list_recipes_page_size_capped(self):
+        for _ in range(3):
+            create_recipe(self.user)
+        with patch.object(KeysetPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPES_URL, {'page_size': 100})
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_filter_by_tags_any(self):
+        r1, r2 = create_recipe(self.user), create_recipe(self.user)
+        create_recipe(self.user)
+        t1 = Tag.objects.create(user=self.user, name='Vegan')
+        t2 = Tag.objects.create(user=self.user, name='Quick')
+        r1.tags.add(t1)
+        r2.tags.add(t1, t2)
+        res = self.client.get(RECIPES_URL, {'tags': f'{t1.id},{t2.id}'})
+        self.assertEqual([r['id'] for r in res.data], [r2.id, r1.id])
+
+    def test_filter_by_tags_all(self):
+        r1, r2 = create_recipe(self.user), create_recipe(self.user)
+        t1 = Tag.objects.create(user=self.user, name='Vegan')
+        t2 = Tag.objects.create(user=self.user, name='Quick')
+        r1.tags.add(t1)
+        r2.tags.add(t1, t2)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                RECIPES_URL, {'tags': f'{t1.id},{t2.id}', 'match': 'all'})
+        self.assertEqual([r['id'] for r in res.data], [r2.id])
+        self.assertIn('HAVING', ctx.captured_queries[0]['sql'])
+
+    def test_filter_by_tags_and_ingredients(self):
+        r1, r2 = create_recipe(self.user), create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ing = Ingredient.objects.create(user=self.user, name='Tofu')
+        r1.tags.add(tag)
+        r2.tags.add(tag)
+        r2.ingredients.add(ing)
+        res = self.client.get(
+            RECIPES_URL, {'tags': str(tag.id), 'ingredients': str(ing.id)})
+
+        self.assertEqual([r['id'] for r in res.data], [r2.id])
+
+    def test_filter_bad_ids(self):
+        res = self.client.get(RECIPES_URL, {'tags': 'a,b'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeBudgetTest(QueryBudgetMixin, TestCase):
+    """Database cost of the recipe endpoints; a blown budget lists the SQL."""
+    query_budgets = {
+        'recipe-list': Budget(queries=3, db_ms=100),
+        'recipe-retrieve': Budget(queries=3),
+        'recipe-create': Budget(queries=19),
+        'recipe-partial_update': Budget(queries=18),
+        'recipe-destroy': Budget(queries=11),
+        # SQLite saves the recipes one by one, bulk inserts need far fewer
+        'recipe-bulk': Budget(queries=48),
+    }
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@gmail.com', password='123456', name='name')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for n in range(10):
+            create_full_recipe(self.user, n)
+        self.recipe = Recipe.objects.filter(user=self.user).first()
+
+    def test_list(self):
+        res = self.request_within_budget('get', RECIPES_URL)
+        self.assertEqual(len(res.data), 10)
+
+    def test_retrieve(self):
+        self.request_within_budget('get', detail_url(self.recipe.id))
 
+    def test_create(self):
+        payload = {
+            'title': 'Curry', 'time_minutes': 30, 'price': '7.00',
+            'tags': [{'name': 'tag 0'}, {'name': 'Spicy'}],
+            'ingredients': [{'name': 'Rice'}],
+        }
+        res = self.request_within_budget(
+            'post', RECIPES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_partial_update(self):
+        payload = {'title': 'New',
+                   'tags': [{'name': 'tag 0'}, {'name': 'Other'}]}
+        res = self.request_within_budget(
+            'patch', detail_url(self.recipe.id), payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_destroy(self):
+        res = self.request_within_budget('delete', detail_url(self.recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_bulk(self):
+        payload = {'create': [
+            {'title': f'Bulk {n}', 'time_minutes': 5, 'price': '1.00',
+             'tags': [{'name': f'tag {n}'}]}
+            for n in range(20)
+        ]}
+        res = self.request_within_budget(
+            'post', reverse('recipe:recipe-bulk'), payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
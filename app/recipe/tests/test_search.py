@@ -0,0 +1,103 @@
+from django.test import TestCase, SimpleTestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from decimal import Decimal
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Recipe, Tag
+
+from recipe.search import InvertedIndex, highlight
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, title, description=''):
+    return Recipe.objects.create(
+        user=user, title=title, description=description, time_minutes=5,
+        price=Decimal('1.00'))
+
+
+class InvertedIndexTest(SimpleTestCase):
+    def test_title_ranks_above_description(self):
+        index = InvertedIndex([
+            (1, 'Pasta bake', 'with tomato'),
+            (2, 'Tomato soup', ''),
+            (3, 'Salad', 'no match here'),
+        ])
+        self.assertEqual([pk for pk, rank in index.search({'tomato'})], [2, 1])
+
+    def test_all_terms_required(self):
+        index = InvertedIndex(
+            [(1, 'Tomato soup', ''), (2, 'Tomato pasta', '')])
+        hits = index.search({'tomato', 'soup'})
+        self.assertEqual([pk for pk, rank in hits], [1])
+
+    def test_highlight(self):
+        self.assertEqual(
+            highlight('Tomato soup', {'tomato'}), '<b>Tomato</b> soup')
+
+
+class SearchApiTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_search(self):
+        soup = create_recipe(self.user, 'Tomato soup')
+        bake = create_recipe(self.user, 'Pasta bake', 'Topped with tomato')
+        create_recipe(self.user, 'Salad')
+        res = self.client.get(RECIPES_URL, {'q': 'tomato'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [soup.id, bake.id])
+        self.assertGreater(res.data[0]['rank'], res.data[1]['rank'])
+        self.assertEqual(res.data[0]['headline'], '<b>Tomato</b> soup')
+
+    def test_search_only_own_recipes(self):
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com', password='123456')
+        create_recipe(other, 'Tomato soup')
+        res = self.client.get(RECIPES_URL, {'q': 'tomato'})
+        self.assertEqual(res.data, [])
+
+    def test_search_sees_new_recipes(self):
+        self.client.get(RECIPES_URL, {'q': 'curry'})
+        create_recipe(self.user, 'Green curry')
+        res = self.client.get(RECIPES_URL, {'q': 'curry'})
+        self.assertEqual(len(res.data), 1)
+
+    def test_search_with_tag_filter_and_limit(self):
+        tag = Tag.objects.create(user=self.user, name='Quick')
+        for n in range(3):
+            create_recipe(self.user, f'Egg dish {n}').tags.add(tag)
+        create_recipe(self.user, 'Egg salad')
+        res = self.client.get(
+            RECIPES_URL, {'q': 'egg', 'tags': str(tag.id), 'page_size': 2})
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertTrue(all(r['tags'] == [{'id': tag.id, 'name': 'Quick'}]
+                            for r in res.data['results']))
+
+    def test_search_pages_through_every_match(self):
+        for n in range(3):
+            create_recipe(self.user, f'Egg dish {n}', 'with egg')
+        for n in range(2):
+            create_recipe(self.user, f'Egg salad {n}')
+        create_recipe(self.user, 'Salad')
+        unpaged = self.client.get(RECIPES_URL, {'q': 'egg'}).data
+        self.assertEqual(len(unpaged), 5)
+
+        seen = []
+        res = self.client.get(RECIPES_URL, {'q': 'egg', 'page_size': 2})
+        while True:
+            self.assertIsNone(res.data['previous'])
+            seen += [r['id'] for r in res.data['results']]
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+        self.assertEqual(seen, [r['id'] for r in unpaged])
+
+    def test_search_bad_cursor(self):
+        res = self.client.get(RECIPES_URL, {'q': 'egg', 'cursor': 'cD14'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
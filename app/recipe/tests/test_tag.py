@@ -5,6 +5,7 @@ from decimal import Decimal
 from rest_framework.test import APIClient
 from rest_framework import status
 from core.models import Recipe, Tag
+from core.testing import Budget, QueryBudgetMixin
 
 from recipe.serializers import TagSerializer
 
@@ -72,4 +73,75 @@ class PrivateTagTest(TestCase):
             res = self.client.delete(url)
             self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
             all = Tag.objects.filter(user=self.user)
-            self.assertFalse(all.exists())
\ No newline at end of file
+            self.assertFalse(all.exists())
+
+    def test_rename_to_existing_name(self):
+        first = Tag.objects.create(user=self.user, name='1')
+        Tag.objects.create(user=self.user, name='2')
+        res = self.client.patch(detail_url(first.id), {'name': '2'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        # keeping its own name, or taking one only another user has, is fine
+        res = self.client.patch(detail_url(first.id), {'name': '1'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        Tag.objects.create(user=create_user(), name='3')
+        res = self.client.patch(detail_url(first.id), {'name': '3'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_tag_paginated(self):
+        for name in ['1', '2', '3']:
+            Tag.objects.create(user=self.user, name=name)
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['name'] for t in res.data['results']], ['3', '2'])
+        res = self.client.get(res.data['next'])
+        self.assertEqual([t['name'] for t in res.data['results']], ['1'])
+        self.assertIsNone(res.data['next'])
+
+    def test_filter_assigned_only(self):
+        t1 = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        for _ in range(2):
+            recipe = Recipe.objects.create(
+                user=self.user, title='Eggs', time_minutes=5,
+                price=Decimal('1.00'))
+            recipe.tags.add(t1)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        t1.refresh_from_db()
+        self.assertEqual(res.data, TagSerializer([t1], many=True).data)
+
+
+class TagBudgetTest(QueryBudgetMixin, TestCase):
+    """Database cost of the tag endpoints; a blown budget lists the SQL."""
+    query_budgets = {
+        'tag-list': Budget(queries=1),
+        'tag-partial_update': Budget(queries=3),
+        'tag-destroy': Budget(queries=3),
+    }
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.objs = [Tag.objects.create(user=self.user, name=f'tag {n}')
+                     for n in range(10)]
+        recipe = Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=5,
+            price=Decimal('1.00'))
+        recipe.tags.add(*self.objs[:5])
+
+    def test_list(self):
+        res = self.request_within_budget('get', TAGS_URL)
+        self.assertEqual(len(res.data), 10)
+
+    def test_assigned_only(self):
+        res = self.request_within_budget('get', TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(len(res.data), 5)
+
+    def test_partial_update(self):
+        self.request_within_budget(
+            'patch', detail_url(self.objs[0].id), {'name': 'New'})
+
+    def test_destroy(self):
+        self.request_within_budget('delete', detail_url(self.objs[0].id))
@@ -1,41 +1,196 @@
+from functools import partial
+
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
+from django.db.models import Count, Exists, OuterRef, Prefetch
 from recipe import serializers
 from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from core.authentication import (
+    CachedTokenAuthentication, SignedTokenAuthentication,
+)
 from core.models import Recipe, Tag, Ingredient
-from recipe.serializers import RecipeSerializer, RecipeDetailSerializer, TagSerializer, IngredientSerializer
+from core.routers import ReplicaReadMixin
+from recipe.bulk import bulk_write
+from recipe.caching import CachedListMixin
+from recipe.export import CONTENT_TYPES, WRITERS, iter_recipes
+from recipe.images import ImageUploadHandler, attach
+from recipe.fastpath import FastListMixin
+from recipe.pagination import KeysetPagination, SearchPagination
+from recipe.search import search_recipes
+from recipe.serializers import (
+    RecipeSerializer, RecipeDetailSerializer, RecipeSearchSerializer,
+    RecipeBulkSerializer, RecipeImageSerializer, TagSerializer,
+    IngredientSerializer,
+)
 # Create your views here.
 
-class Common(mixins.DestroyModelMixin, mixins.UpdateModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
-    authentication_classes = [TokenAuthentication]
+
+def _params_to_ints(name, value):
+    """Turn '1,2,3' into [1, 2, 3]."""
+    try:
+        return [int(part) for part in value.split(',') if part]
+    except ValueError:
+        raise ValidationError(
+            {name: 'Expected a comma separated list of ids.'})
+
+
+class Common(ReplicaReadMixin, CachedListMixin, mixins.DestroyModelMixin,
+             mixins.UpdateModelMixin, mixins.ListModelMixin,
+             viewsets.GenericViewSet):
+    authentication_classes = [
+        SignedTokenAuthentication, CachedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    recipe_field = None
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(user=self.request.user).order_by('-id')
+        if self.request.query_params.get('assigned_only') in ('1', 'true'):
+            # EXISTS stops at the first recipe and never duplicates rows
+            # like a join would
+            through = getattr(Recipe, self.recipe_field).through
+            field = Recipe._meta.get_field(
+                self.recipe_field).m2m_reverse_field_name()
+            queryset = queryset.filter(Exists(
+                through.objects.filter(**{field: OuterRef('pk')})))
+        return queryset
 
 class TagViewSet(Common):
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
+    recipe_field = 'tags'
 
 class IngredientViewSet(Common):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
+    recipe_field = 'ingredients'
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(ReplicaReadMixin, CachedListMixin, FastListMixin,
+                    viewsets.ModelViewSet):
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        SignedTokenAuthentication, CachedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(user=self.request.user).order_by('-id')
+        match_all = self.request.query_params.get('match') == 'all'
+        for field in ('tags', 'ingredients'):
+            value = self.request.query_params.get(field)
+            if value:
+                ids = _params_to_ints(field, value)
+                queryset = queryset.filter(
+                    id__in=self._recipes_with(field, ids, match_all))
+        # load nested tags/ingredients in one query each instead of per recipe,
+        # ordered by id like recipe.fastpath so both paths render the same
+        return queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch('ingredients',
+                     queryset=Ingredient.objects.order_by('id')),
+        )
+
+    def _recipes_with(self, field, ids, match_all):
+        """Subquery of the recipe ids linked to any (or all) ids via field."""
+        through = getattr(Recipe, field).through
+        column = Recipe._meta.get_field(field).m2m_reverse_field_name()
+        rows = through.objects.filter(
+            **{f'{column}__in': ids}).values('recipe_id')
+        if match_all:
+            # one GROUP BY ... HAVING instead of a join per id
+            rows = rows.annotate(n=Count(column, distinct=True)).filter(
+                n=len(set(ids)))
+        return rows.values('recipe_id')
 
     def get_serializer_class(self):
         if self.action == 'list':
+            if self.request.query_params.get('q'):
+                return RecipeSearchSerializer
             return RecipeSerializer
+        if self.action == 'bulk':
+            return RecipeBulkSerializer
+        if self.action == 'upload_image':
+            return RecipeImageSerializer
 
         return self.serializer_class
 
+    @property
+    def paginator(self):
+        """SearchPagination for ranked search results, else the keyset."""
+        if not hasattr(self, '_paginator'):
+            q = self.request.query_params.get('q')
+            ranked = self.action == 'list' and q
+            self._paginator = (
+                SearchPagination() if ranked else self.pagination_class())
+        return self._paginator
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        q = self.request.query_params.get('q')
+        if self.action == 'list' and q:
+            # ranked, so searched a page at a time: the paginator says which
+            search = partial(search_recipes, queryset, self.request.user.pk, q)
+            page = self.paginator.paginate_queryset(
+                search, self.request, view=self)
+            return search() if page is None else page
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        if isinstance(queryset, list):
+            # search results, already paged by filter_queryset if asked to
+            return queryset if self.paginator.asked_for(self.request) else None
+        return super().paginate_queryset(queryset)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create, update and delete many recipes in one request."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results, code = bulk_write(request.user, **serializer.validated_data)
+        return Response(results, status=code)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream every recipe of the user as NDJSON.
+
+        ?type=csv or ?type=json pick the other formats.
+        """
+        kind = request.query_params.get('type', 'ndjson')
+        if kind not in WRITERS:
+            raise ValidationError(
+                {'type': f'Expected one of {", ".join(WRITERS)}.'})
+        recipes = iter_recipes(self.filter_queryset(self.get_queryset()))
+        response = StreamingHttpResponse(
+            WRITERS[kind](recipes), content_type=CONTENT_TYPES[kind])
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{kind}"')
+        return response
+
+    @action(detail=True, methods=['post'], url_path='upload-image',
+            parser_classes=[MultiPartParser])
+    def upload_image(self, request, pk=None):
+        """Set the recipe image from the multipart file `image`.
+
+        The thumbnail follows in the background.
+        """
+        recipe = self.get_object()
+        # streamed to disk and checked as it arrives, see recipe.images
+        handler = ImageUploadHandler(request)
+        request.upload_handlers = [handler]
+        upload = request.FILES.get('image')
+        if upload is None:
+            raise ValidationError(
+                {'image': handler.error or 'No image was uploaded.'})
+        attach(recipe, upload)
+        return Response(self.get_serializer(recipe).data)
@@ -0,0 +1,13 @@
+from django.urls import path
+from core.async_views import offload_view
+from . import views
+
+app_name = 'user-async'
+
+urlpatterns = [
+    # password hashing runs on the pool, other requests keep being served
+    # meanwhile
+    path('token/',
+         offload_view(views.CreateTokenView.as_view(), auth_required=False),
+         name='token'),
+]
@@ -1,11 +1,14 @@
 from django.contrib.auth import get_user_model, authenticate
 from rest_framework import serializers
 from django.utils.translation import gettext as _
+from core.instrumentation import TimedSerializerMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
-        fields = ['email', 'password', 'name']
+        fields = ['email', 'password', 'name', 'recipe_count']
+        read_only_fields = ['recipe_count']
         extra_kwargs = {'password': {'write_only': True, 'min_length': 4}}
 
     def create(self, data):
@@ -13,12 +16,16 @@ class UserSerializer(serializers.ModelSerializer):
 
     def update(self, instance, data):
         password = data.pop('password', None)
-        user = super().update(instance, data)
+        fields = list(data)
+        for attr, value in data.items():
+            setattr(instance, attr, value)
         if password:
-            user.set_password(password)
-            user.save()
-
-        return user
+            # hashed before the one save below, not saved twice
+            instance.set_password(password)
+            fields.append('password')
+        # only what was sent; recipe_count is kept by core.counters
+        instance.save(update_fields=fields)
+        return instance
 
 class TokenSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -1,13 +1,19 @@
 """
 Tests for the user API.
 """
+from decimal import Decimal
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.authentication import local_tokens
+from core.models import Recipe
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -117,7 +123,11 @@ class PrivateUserTest(TestCase):
 
     def test_profile_success(self):
         res = self.client.get(ME_URL)
-        self.assertEqual(res.data, {'name': self.user.name, 'email': self.user.email,})
+        self.assertEqual(res.data, {
+            'name': self.user.name,
+            'email': self.user.email,
+            'recipe_count': 0,
+        })
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
 
@@ -132,3 +142,30 @@ class PrivateUserTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.user.refresh_from_db()
         self.assertTrue(self.user.check_password(payload['password']))
+
+
+class CachedUserProfileTest(TestCase):
+    def setUp(self):
+        local_tokens.clear()
+        self.user = create_user(email='test@gmail.com', password='123456')
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_recipe_count_not_stale_or_written_back(self):
+        # caches the token and its user
+        self.client.get(ME_URL)
+        for n in range(3):
+            Recipe.objects.create(
+                user=self.user, title=f'R{n}', time_minutes=5,
+                price=Decimal('1.00'),
+            )
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['recipe_count'], 3)
+
+        res = self.client.patch(ME_URL, {'name': 'New', 'recipe_count': 0})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'New')
+        self.assertEqual(self.user.recipe_count, 3)
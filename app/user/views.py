@@ -1,9 +1,28 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.shortcuts import render
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
-from rest_framework import generics, authentication, permissions
+from rest_framework import exceptions, generics, permissions, status, views
+from rest_framework.response import Response
+from core import tokens
+from core.authentication import (
+    CachedTokenAuthentication, SignedTokenAuthentication,
+)
+from core.throttling import IPThrottle, LoginThrottle
 from .serializers import UserSerializer, TokenSerializer
 
+AUTHENTICATION = [SignedTokenAuthentication, CachedTokenAuthentication]
+
+
+def signed_token_response(user):
+    token, expires = tokens.issue(user)
+    expires = datetime.datetime.fromtimestamp(
+        expires, tz=datetime.timezone.utc)
+    return Response({'token': token, 'expires': expires.isoformat()})
+
 # Create your views here.
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
@@ -11,10 +30,47 @@ class CreateUserView(generics.CreateAPIView):
 class CreateTokenView(ObtainAuthToken):
     serializer_class = TokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = [LoginThrottle, IPThrottle]
+
+    def post(self, request, *args, **kwargs):
+        if getattr(settings, 'TOKEN_MODE', 'db') != 'signed':
+            return super().post(request, *args, **kwargs)
+        # nothing to write: the token carries its own user and expiry
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return signed_token_response(serializer.validated_data['user'])
+
+
+class RefreshTokenView(views.APIView):
+    """Swap a signed token for a fresh one; the old one is revoked."""
+    authentication_classes = [SignedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        request.auth.delete()
+        return signed_token_response(request.user)
 
 class ManageView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
     def get_object(self):
-        return self.request.user
+        # request.user may be a cached copy (CachedTokenAuthentication) or
+        # carry only the pk (signed tokens); counters such as recipe_count
+        # move under it with update(), so always read the row
+        user = get_user_model().objects.filter(pk=self.request.user.pk).first()
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return user
+
+
+class LogoutView(views.APIView):
+    authentication_classes = AUTHENTICATION
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        # deleting a DB token also evicts it from the auth cache
+        # (core.signals), a signed one goes on the denylist
+        if request.auth is not None:
+            request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)